@@ -0,0 +1,79 @@
+# ---------------------------------------------------
+# Service alert flags for hourly ridership rows
+# Replaces the row-wise flag_alerts apply with a hash join on
+# (alert date, Stop Name), plus an optional time-window variant.
+# Dependencies (install with pip if needed):
+#   pandas, numpy
+# ---------------------------------------------------
+import numpy as np
+import pandas as pd
+
+
+def explode_affected(df_alerts: pd.DataFrame, sep: str = None) -> pd.DataFrame:
+    """
+    Turn alerts into unique (alert_date, Stop Name, alert_time) rows.
+
+    Args:
+    - df_alerts (DataFrame): Cleaned alerts with a datetime 'Date' and an 'Affected' column.
+    - sep (str): Optional separator for multi-valued 'Affected' entries (e.g. '|').
+      By default the whole 'Affected' string is matched, as in the original notebook.
+
+    Returns:
+    - DataFrame: Columns alert_date (midnight timestamp), Stop Name, alert_time.
+    """
+    affected = df_alerts['Affected'].astype(str)
+    if sep is not None:
+        affected = affected.str.split(sep)
+    pairs = pd.DataFrame({
+        'alert_time': pd.to_datetime(df_alerts['Date']).values,
+        'Stop Name': affected.values,
+    })
+    if sep is not None:
+        pairs = pairs.explode('Stop Name')
+        pairs['Stop Name'] = pairs['Stop Name'].str.strip()
+    pairs['alert_date'] = pairs['alert_time'].dt.normalize()
+    return pairs.dropna(subset=['alert_time']).drop_duplicates(ignore_index=True)
+
+
+def flag_alerts(df_ridership: pd.DataFrame, df_alerts: pd.DataFrame, window=None,
+                sep: str = None) -> pd.Series:
+    """
+    Vectorized is_alert flag for every ridership row.
+
+    Without `window`, a row is flagged when an alert on the same calendar day lists
+    its 'Stop Name' (hash lookup of (date, stop) pairs). With `window` (e.g. '3h'),
+    a row is flagged only when such an alert was posted during its hour or within
+    `window` before it.
+
+    Args:
+    - df_ridership (DataFrame): Rows with 'transit_timestamp' and 'Stop Name'.
+    - df_alerts (DataFrame): Cleaned alerts (see explode_affected).
+    - window (str | Timedelta): Optional look-back window for the time-overlap mode.
+    - sep (str): Separator for multi-valued 'Affected' entries.
+
+    Returns:
+    - Series: int8 flags aligned with df_ridership.index.
+    """
+    pairs = explode_affected(df_alerts, sep)
+    ts = pd.to_datetime(df_ridership['transit_timestamp'])
+    stops = df_ridership['Stop Name'].astype(object)
+
+    if window is None:
+        keys = pd.MultiIndex.from_arrays([pairs['alert_date'], pairs['Stop Name']])
+        rows = pd.MultiIndex.from_arrays([ts.dt.normalize(), stops])
+        flags = rows.isin(keys)
+        return pd.Series(flags.astype('int8'), index=df_ridership.index, name='is_alert')
+
+    # Time-window mode: latest alert for the stop posted before the end of the row's hour
+    left = pd.DataFrame({'hour_end': (ts + pd.Timedelta(hours=1)).values, 'Stop Name': stops.values,
+                         'row': np.arange(len(ts))}).dropna(subset=['hour_end'])
+    right = pairs[['alert_time', 'Stop Name']].sort_values('alert_time')
+    matched = pd.merge_asof(
+        left.sort_values('hour_end'), right,
+        left_on='hour_end', right_on='alert_time', by='Stop Name',
+        direction='backward', allow_exact_matches=False,
+    )
+    hit = matched['alert_time'] >= matched['hour_end'] - pd.Timedelta(hours=1) - pd.Timedelta(window)
+    flags = np.zeros(len(ts), dtype='int8')
+    flags[matched.loc[hit, 'row'].to_numpy()] = 1
+    return pd.Series(flags, index=df_ridership.index, name='is_alert')
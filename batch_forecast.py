@@ -0,0 +1,143 @@
+# ---------------------------------------------------
+# Offline batch forecasting for every station
+# Fits the dashboard's forecasting engine for all stations and writes a single
+# forecast table the dashboard reads: the Fourier engine in one batched solve,
+# Prophet in parallel (one process per core).
+# Usage:
+#   python batch_forecast.py --rollups rollups --output forecasts.parquet --engine fourier
+#   python batch_forecast.py --rollups rollups --output forecasts.parquet --engine prophet --workers 8
+# Dependencies (install with pip if needed):
+#   pandas, numpy, pyarrow (prophet for --engine prophet)
+# ---------------------------------------------------
+import argparse
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from forecasting import DEFAULT_ENGINE, ENGINES, daily_series, fit_fourier_batch, fit_prophet_forecast
+from forecast_store import series_fingerprint
+from rollups import ROLLUP_DIR, RollupIndex, load_rollups
+
+FORECAST_TABLE = "forecasts.parquet"  # Default output table
+FORECAST_COLUMNS = ['ds', 'yhat', 'yhat_lower', 'yhat_upper']
+
+
+def _init_worker():
+    """Import Prophet once per worker, then silence the per-fit Stan log lines."""
+    import prophet  # noqa: F401
+    logging.getLogger('cmdstanpy').disabled = True
+
+
+def _fit_station(job):
+    """Worker: fit one station and return its forecast rows tagged with the cache key fields."""
+    station_id, daily, start, end, days = job
+    ts = daily_series(daily)
+    if len(ts) < 2:
+        return None  # Prophet needs at least two observations
+    _, forecast = fit_prophet_forecast(ts, days)
+    out = forecast[FORECAST_COLUMNS].copy()
+    out['station_complex_id'] = str(station_id)
+    out['start'] = pd.Timestamp(start)
+    out['end'] = pd.Timestamp(end)
+    out['days'] = days
+    out['data_version'] = series_fingerprint(ts)
+    out['engine'] = 'prophet'
+    return out
+
+
+def _fit_fourier(jobs: list, days: int) -> pd.DataFrame:
+    """Fit every station's series (as the dashboard builds it) in one fit_fourier_batch call."""
+    series = {str(sid): daily_series(daily) for sid, daily, *_ in jobs}
+    series = {sid: ts for sid, ts in series.items() if len(ts) >= 2}  # Same minimum as the Prophet path
+    if not series:
+        return pd.DataFrame()
+    history = pd.concat([ts.assign(station_complex_id=sid) for sid, ts in series.items()], ignore_index=True)
+    _, table = fit_fourier_batch(history, days)
+    _, _, start, end, _ = jobs[0]
+    table = table[FORECAST_COLUMNS + ['station_complex_id']].copy()
+    table['start'] = pd.Timestamp(start)
+    table['end'] = pd.Timestamp(end)
+    table['days'] = days
+    table['data_version'] = table['station_complex_id'].map({sid: series_fingerprint(ts) for sid, ts in series.items()})
+    table['engine'] = 'fourier'
+    return table
+
+
+def run_batch(rollup_dir: str = ROLLUP_DIR, output: str = FORECAST_TABLE, days: int = 7,
+              workers: int = None, stations=None, engine: str = DEFAULT_ENGINE) -> pd.DataFrame:
+    """
+    Forecast every station over the full history and write the forecast table.
+
+    Args:
+    - rollup_dir (str): Directory written by rollups.py (daily cube is used).
+    - output (str): Parquet file to write.
+    - days (int): Forecast horizon in days.
+    - workers (int): Process pool size (defaults to all cores).
+    - stations (list): Optional subset of station_complex_id values.
+    - engine (str): 'fourier' (one batched solve) or 'prophet' (process pool).
+
+    Returns:
+    - DataFrame: The forecast table that was written.
+    """
+    cubes = load_rollups(rollup_dir)
+    index = RollupIndex(cubes)
+    start, end = cubes['daily']['date'].min(), cubes['daily']['date'].max()  # Same bounds as the dashboard default
+    station_ids = stations or sorted(cubes['daily']['station_complex_id'].astype(str).unique())
+    jobs = [(sid, index.daily(sid, start, end), start, end, days) for sid in station_ids]
+
+    t0 = time.time()
+    if engine == 'fourier':
+        table = _fit_fourier(jobs, days)
+    elif engine == 'prophet':
+        with ProcessPoolExecutor(max_workers=workers or os.cpu_count(), initializer=_init_worker) as pool:
+            parts = [p for p in pool.map(_fit_station, jobs, chunksize=4) if p is not None]
+        table = pd.concat(parts, ignore_index=True)
+    else:
+        raise ValueError(f"Unknown forecast engine {engine!r}, expected one of {ENGINES}")
+    table.to_parquet(output, index=False)
+    n = table['station_complex_id'].nunique() if len(table) else 0
+    print(f"Forecasted {n} stations with {engine} in {time.time() - t0:.1f}s -> {output}")
+    return table
+
+
+def load_forecast_table(path: str = FORECAST_TABLE) -> dict:
+    """Read the forecast table into {station_complex_id: rows} for O(1) lookups (empty if missing)."""
+    if not os.path.exists(path):
+        return {}
+    table = pd.read_parquet(path)
+    return {sid: part.reset_index(drop=True)
+            for sid, part in table.groupby('station_complex_id', sort=False, observed=True)}
+
+
+def lookup_forecast(tables: dict, station_id, start, end, days: int, data_version: str,
+                    engine: str = DEFAULT_ENGINE):
+    """
+    Return the precomputed forecast for a request, or None if it was not batch-computed.
+
+    The rows are used only when the range, horizon, data version and engine all match,
+    so a stale table never hides newer data.
+    """
+    part = tables.get(str(station_id))
+    if part is None:
+        return None
+    first = part.iloc[0]
+    if (first['start'].date() != pd.Timestamp(start).date() or first['end'].date() != pd.Timestamp(end).date()
+            or first['days'] != days or first['data_version'] != data_version
+            or first.get('engine', 'prophet') != engine):  # Tables from before engines were recorded
+        return None
+    return part[FORECAST_COLUMNS]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Precompute forecasts for every station.")
+    parser.add_argument('--rollups', default=ROLLUP_DIR, help="Rollup directory written by rollups.py")
+    parser.add_argument('--output', default=FORECAST_TABLE, help="Forecast table to write")
+    parser.add_argument('--days', type=int, default=7, help="Forecast horizon in days")
+    parser.add_argument('--engine', choices=ENGINES, default=DEFAULT_ENGINE, help="Forecasting engine")
+    parser.add_argument('--workers', type=int, default=None, help="Prophet worker processes (default: all cores)")
+    parser.add_argument('--stations', nargs='*', default=None, help="Optional station_complex_id subset")
+    args = parser.parse_args()
+    run_batch(args.rollups, args.output, args.days, args.workers, args.stations, args.engine)
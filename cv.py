@@ -0,0 +1,157 @@
+# ---------------------------------------------------
+# Rolling-origin cross-validation for the ridership model
+# Folds are cut on transit_timestamp: every station's rows before the origin
+# train the model and the next horizon of its rows test it, so no fold ever
+# sees the future. Early stopping uses the tail of each fold's train window
+# and category vocabularies are fitted per fold on its train rows, so the
+# test window never influences the model. Each fold's quantized matrices are
+# built once, then reused by every evaluation (e.g. comparing parameter sets);
+# folds train in parallel threads.
+# Usage:
+#   python cv.py --master master_df.parquet --splits 5 --horizon 7D --workers 5
+# Dependencies (install with pip if needed):
+#   pandas, numpy, xgboost>=2.0
+# ---------------------------------------------------
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+
+from train import MAX_BIN, TARGET, TIME, default_nthread, evaluate, feature_frame, predict, train_model
+
+
+def rolling_origin_splits(timestamps, n_splits: int = 5, horizon=None, gap='0h'):
+    """
+    Expanding-window splits on time.
+
+    The last n_splits horizons of the data are the test windows; fold k trains
+    on every row before its origin minus `gap` and tests on [origin, origin + horizon).
+    All stations share the origins, so each station's series is split in time order.
+
+    Args:
+    - timestamps (array-like): Row timestamps (any order).
+    - n_splits (int): Number of folds.
+    - horizon (str | Timedelta): Test window length (default: span / (n_splits + 1), like TimeSeriesSplit).
+    - gap (str | Timedelta): Hours left out between train and test.
+
+    Returns:
+    - list: (origin, train row positions, test row positions) per fold, oldest first.
+    """
+    ts = pd.to_datetime(pd.Series(timestamps)).to_numpy()
+    end = ts.max() + np.timedelta64(1, 'h')  # Exclusive end of the last test window (hourly rows)
+    horizon = (end - ts.min()) / (n_splits + 1) if horizon is None else pd.Timedelta(horizon).to_timedelta64()
+    gap = pd.Timedelta(gap).to_timedelta64()
+    splits = []
+    for k in range(n_splits, 0, -1):
+        origin = pd.Timestamp(end - k * horizon).ceil('h').to_datetime64()  # Origins on the hour
+        train = np.flatnonzero(ts < origin - gap)
+        test = np.flatnonzero((ts >= origin) & (ts < origin + horizon))
+        if len(train) and len(test):
+            splits.append((pd.Timestamp(origin), train, test))
+    return splits
+
+
+def build_folds(df: pd.DataFrame, splits: list, max_bin: int = MAX_BIN, nthread: int = None,
+                valid_horizon=None) -> list:
+    """
+    Build each fold's (dtrain, dvalid, dtest) matrices once, using only what the fold may see.
+
+    The last `valid_horizon` of every fold's train window is held out as the
+    early-stopping set, so the test window never picks the number of trees,
+    and the category vocabulary is fitted on the remaining train rows only.
+
+    Args:
+    - valid_horizon (str | Timedelta): Inner validation tail (default: as long as the fold's test window).
+
+    Returns:
+    - list: Dicts with origin, dtrain, dvalid (None when the train window is too short), dtest,
+      y_test and row counts, reusable across cross_validate calls.
+    """
+    ts = pd.to_datetime(df[TIME]).to_numpy()
+    nthread = nthread or default_nthread()
+    folds = []
+    for origin, train, test in splits:
+        origin = origin.to_datetime64()
+        tail = (ts[test].max() + np.timedelta64(1, 'h') - origin if valid_horizon is None
+                else pd.Timedelta(valid_horizon).to_timedelta64())
+        cut = ts[train].max() + np.timedelta64(1, 'h') - tail
+        fit, valid = train[ts[train] < cut], train[ts[train] >= cut]
+        if not len(fit):
+            fit, valid = train, train[:0]
+        X_fit, y_fit, encoder = feature_frame(df.iloc[fit])  # Vocabulary from the fold's fit rows only
+        dtrain = xgb.QuantileDMatrix(X_fit, label=y_fit, max_bin=max_bin, nthread=nthread, enable_categorical=True)
+        matrices = {}
+        for name, rows in (('dvalid', valid), ('dtest', test)):
+            X, y, _ = feature_frame(df.iloc[rows], encoder)
+            matrices[name] = xgb.QuantileDMatrix(X, label=y, ref=dtrain, max_bin=max_bin, nthread=nthread,
+                                                 enable_categorical=True) if len(rows) else None
+        folds.append({'origin': pd.Timestamp(origin), 'dtrain': dtrain, **matrices,
+                      'y_test': df[TARGET].to_numpy()[test],
+                      'n_train': len(fit), 'n_valid': len(valid), 'n_test': len(test)})
+    return folds
+
+
+def cross_validate(folds: list, params: dict = None, num_boost_round: int = 1000, early_stopping_rounds: int = 50,
+                   workers: int = None, max_bin: int = MAX_BIN, return_predictions: bool = False):
+    """
+    Train and score every fold in parallel threads.
+
+    Early stopping watches each fold's inner validation tail (see build_folds);
+    a fold without one trains the full num_boost_round. The test window is only
+    ever predicted, so the scores are out-of-sample.
+
+    Args:
+    - folds (list): From build_folds.
+    - params (dict): Overrides of train.DEFAULT_PARAMS.
+    - workers (int): Concurrent folds; the cores are split evenly between them.
+
+    Returns:
+    - DataFrame: fold, origin, n_train, n_valid, n_test, mae, rmse, r2, best_iteration, seconds
+      (plus a dict fold -> (y_true, y_pred) when return_predictions).
+    """
+    workers = workers or min(len(folds), default_nthread())
+    nthread = max(1, default_nthread() // workers)
+
+    def run(item):
+        fold, f = item
+        t0 = time.time()
+        booster = train_model(f['dtrain'], f['dvalid'], params, num_boost_round, early_stopping_rounds,
+                              nthread=nthread, max_bin=max_bin, verbose_eval=False)
+        y_pred = predict(booster, f['dtest'])
+        row = {'fold': fold, 'origin': f['origin'], 'n_train': f['n_train'], 'n_valid': f['n_valid'],
+               'n_test': f['n_test'], **evaluate(f['y_test'], y_pred),
+               'best_iteration': getattr(booster, 'best_iteration', None), 'seconds': time.time() - t0}
+        return row, y_pred
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        out = list(pool.map(run, enumerate(folds)))
+    results = pd.DataFrame([row for row, _ in out])
+    if return_predictions:
+        return results, {fold: (folds[fold]['y_test'], y_pred) for fold, (_, y_pred) in enumerate(out)}
+    return results
+
+
+if __name__ == '__main__':
+    from master_store import load_master
+
+    parser = argparse.ArgumentParser(description="Rolling-origin CV of the XGBoost ridership model.")
+    parser.add_argument('--master', default='master_df.parquet', help="Master Parquet dataset")
+    parser.add_argument('--splits', type=int, default=5, help="Number of folds")
+    parser.add_argument('--horizon', default=None, help="Test window per fold, e.g. 7D (default: even split)")
+    parser.add_argument('--gap', default='0h', help="Hours left out between train and test")
+    parser.add_argument('--valid-horizon', default=None,
+                        help="Early-stopping tail of each train window (default: the test horizon)")
+    parser.add_argument('--workers', type=int, default=None, help="Concurrent folds")
+    args = parser.parse_args()
+
+    t0 = time.time()
+    df = load_master(args.master)
+    folds = build_folds(df, rolling_origin_splits(df[TIME], args.splits, args.horizon, args.gap),
+                        valid_horizon=args.valid_horizon)
+    results = cross_validate(folds, workers=args.workers)
+    print(results.to_string(index=False))
+    print(f"Mean MAE {results['mae'].mean():.4f}  RMSE {results['rmse'].mean():.4f}  "
+          f"R² {results['r2'].mean():.4f} ({time.time() - t0:.1f}s)")
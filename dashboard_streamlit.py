@@ -5,63 +5,132 @@ import pandas as pd  # For data manipulation
 import plotly.express as px  # For interactive charts
 from streamlit_folium import st_folium  # To embed Folium maps in Streamlit
 import folium  # For creating Leaflet maps
-from prophet import Prophet  # For time series forecasting
 import json  # For handling JSON data (not used in this script directly)
+import os  # To check for the trained model
+from master_store import (  # Columnar Parquet store for the master table
+    MASTER_PARQUET_DIR, DASHBOARD_COLUMNS, has_master_parquet, load_master, master_date_bounds
+)
+from rollups import ROLLUP_DIR, RollupIndex, build_rollups, has_rollups, load_rollups  # Pre-aggregated chart data
+from station_index import StationIndex  # Binary-search station/date lookups
+from schema import apply_master_schema  # Categorical / compact dtypes for the master table
+from forecasting import DEFAULT_ENGINE, daily_series, fit_forecast, model_to_json  # Fourier / Prophet forecasting
+from forecast_store import FORECAST_STORE_DIR, ForecastStore, series_fingerprint  # On-disk forecast cache
+from batch_forecast import FORECAST_TABLE, load_forecast_table, lookup_forecast  # Nightly precomputed forecasts
+from hourly_forecast import MAX_HOURS, HourlyForecaster  # Recursive hourly XGBoost forecasts
+from serve import MODEL_PATH  # Model saved by train.py
 
 # ---------------------------------------------------
 # Dashboard: MTA Ridership Explorer
 # Dependencies (install with pip if needed):
-#   streamlit, pandas, plotly, streamlit-folium, folium, prophet
+#   streamlit, pandas, pyarrow, plotly, streamlit-folium, folium (prophet for the Prophet engine)
 # ---------------------------------------------------
 
-# Cache the data loading function to avoid reloading data on every app interaction
+# Cache the CSV parse so the fallback path reads the file only once
 @st.cache_data
-def load_data(path: str) -> pd.DataFrame:
-    df = pd.read_csv(path, parse_dates=['transit_timestamp'])  # Read CSV and parse timestamp
-    df['hour'] = df['transit_timestamp'].dt.hour  # Extract hour for hourly analysis
+def read_master_csv(path: str) -> pd.DataFrame:
+    return pd.read_csv(path, parse_dates=['transit_timestamp'])  # Read CSV and parse timestamp
+
+# Cache the data loading function to avoid reloading data on every app interaction
+@st.cache_data(max_entries=4)
+def load_data(path: str, date_range=None) -> pd.DataFrame:
+    if has_master_parquet(path):
+        # Read only the dashboard columns and the date partitions inside the range
+        df = load_master(path, columns=DASHBOARD_COLUMNS, date_range=date_range)
+    else:
+        df = read_master_csv(path)
+        if date_range is not None:
+            dates = df['transit_timestamp'].dt.date
+            df = df.loc[(dates >= date_range[0]) & (dates <= date_range[1])].copy()
+    df = apply_master_schema(df)  # Categoricals, int32/float32, second-resolution timestamps
+    df['hour'] = df['transit_timestamp'].dt.hour.astype('int8')  # Extract hour for hourly analysis
     return df
 
-# Cache the forecast preparation function
+# Cache the date bounds used by the date picker
 @st.cache_data
-def prep_forecast(df_station: pd.DataFrame, days: int = 7):
-    ts = (
-        df_station
-        .set_index('transit_timestamp')['ridership']
-        .resample('D').sum()  # Aggregate daily ridership
-        .reset_index()
-        .rename(columns={'transit_timestamp': 'ds', 'ridership': 'y'})  # Rename for Prophet
-    )
-    m = Prophet(daily_seasonality=True, weekly_seasonality=True)  # Initialize model with seasonality
-    m.fit(ts)  # Fit model
-    future = m.make_future_dataframe(periods=days)  # Create future dataframe
-    forecast = m.predict(future)  # Predict future ridership
+def load_date_bounds(path: str):
+    if has_master_parquet(path):
+        return master_date_bounds(path)  # Read from partition names only
+    dates = read_master_csv(path)['transit_timestamp'].dt.date
+    return dates.min(), dates.max()
+
+# Cache the sorted station/timestamp index of a date window for all sessions (slices are read-only views)
+@st.cache_resource(max_entries=4)
+def load_station_index(path: str, date_range) -> StationIndex:
+    return StationIndex(load_data(path, date_range))
+
+# Cache the rollup cubes for all sessions; build them once if the offline step has not run
+@st.cache_resource
+def load_rollup_index(path: str) -> RollupIndex:
+    if has_rollups(ROLLUP_DIR):
+        cubes = load_rollups(ROLLUP_DIR)  # Written by `python rollups.py`
+    else:
+        cubes = build_rollups(load_data(path))  # One-off aggregation of the full master table
+    return RollupIndex(cubes)
+
+# One on-disk forecast store shared by all sessions (survives restarts)
+@st.cache_resource
+def get_forecast_store() -> ForecastStore:
+    return ForecastStore(FORECAST_STORE_DIR)
+
+# Forecast table written by `python batch_forecast.py`, split per station
+@st.cache_resource
+def get_forecast_table(path: str = FORECAST_TABLE) -> dict:
+    return load_forecast_table(path)
+
+# Hourly forecaster (model + recent history) shared by all sessions; None without a model or Parquet master
+@st.cache_resource
+def get_hourly_forecaster(model_path: str, master_root: str):
+    if not (os.path.exists(model_path) and has_master_parquet(master_root)):
+        return None
+    return HourlyForecaster(model_path, master_root, store=get_forecast_store())
+
+# Forecast preparation: reuse a stored forecast unless the station's daily data changed
+def prep_forecast(daily: pd.DataFrame, station_id, date_range, days: int = 7, engine: str = DEFAULT_ENGINE):
+    ts = daily_series(daily)  # Daily ridership from the rollup cube, renamed for Prophet
+    version = series_fingerprint(ts)
+    forecast = lookup_forecast(get_forecast_table(), station_id, date_range[0], date_range[1], days, version, engine)
+    if forecast is not None:
+        return ts, forecast  # Precomputed by the batch job
+    store = get_forecast_store()
+    key = store.key(station_id, date_range[0], date_range[1], days, version, engine)
+    forecast = store.get(key)
+    if forecast is None:
+        m, forecast = fit_forecast(ts, days, engine)  # Fit only on a cache miss
+        store.put(key, forecast, model_json=model_to_json(m),
+                  meta={'station_complex_id': str(station_id), 'days': days, 'engine': engine})
     return ts, forecast
 
-# Load master dataset
-df_master = load_data("master_df.csv")
+# Prefer the Parquet export of the master dataset, fall back to the CSV
+DATA_PATH = MASTER_PARQUET_DIR if has_master_parquet(MASTER_PARQUET_DIR) else "master_df.csv"
 
 # Define min and max date for date picker
-min_date = df_master['transit_timestamp'].dt.date.min()
-max_date = df_master['transit_timestamp'].dt.date.max()
+min_date, max_date = load_date_bounds(DATA_PATH)
 
 # Sidebar: date range filter
 date_range = st.sidebar.date_input(
     "Date range", [min_date, max_date],
     min_value=min_date, max_value=max_date
 )
+date_range = (date_range[0], date_range[-1])  # A single picked day while selecting means a one-day range
+
+# Master rows of the selected dates only, sorted by (station_complex_id, transit_timestamp)
+index = load_station_index(DATA_PATH, date_range)
 
 # Filter data by selected date range
-filtered = df_master.loc[
-    (df_master['transit_timestamp'].dt.date >= date_range[0]) &
-    (df_master['transit_timestamp'].dt.date <= date_range[1])
-]
+filtered = index.range_frame(date_range[0], date_range[1])
 
 # Sidebar: station selector
-stations = filtered['station_complex'].unique().tolist()
+stations = index.stations_in_range(date_range[0], date_range[1])
 selected_station = st.sidebar.selectbox("Select station", stations)
 
-# Filter data for selected station
-df_station = filtered[filtered['station_complex'] == selected_station]
+# Sidebar: forecasting engine (fast batched Fourier model, or Prophet for the slower, more flexible fit)
+FORECAST_ENGINES = {"Fast (Fourier)": 'fourier', "Accurate (Prophet)": 'prophet'}
+forecast_engine = FORECAST_ENGINES[st.sidebar.radio("Forecast engine", list(FORECAST_ENGINES))]
+
+# Filter data for selected station (binary search on the sorted index)
+station_id = index.station_id(selected_station)
+df_station = index.station_slice(station_id, date_range[0], date_range[1])
+rollup_index = load_rollup_index(DATA_PATH)
 
 # App title
 st.title(f"🚇 MTA Ridership Explorer: {selected_station}")
@@ -70,7 +139,7 @@ st.title(f"🚇 MTA Ridership Explorer: {selected_station}")
 # 1. Hourly Ridership Visualization
 # ---------------------------------------------------
 st.header("Ridership Over Time")
-hourly = df_station.groupby('hour')['ridership'].sum().reset_index()  # Sum ridership by hour
+hourly = rollup_index.hourly_profile(station_id, date_range[0], date_range[1])  # Sum ridership by hour
 fig_h = px.bar(hourly, x='hour', y='ridership', title='Hourly Ridership',
                color='hour', color_continuous_scale='Viridis')  # Bar chart
 fig_h.update_layout(xaxis_title='Hour', yaxis_title='Ridership')
@@ -79,8 +148,8 @@ st.plotly_chart(fig_h, use_container_width=True)  # Display chart
 # ---------------------------------------------------
 # 2. Daily & Weekly Ridership Trends
 # ---------------------------------------------------
-daily = df_station.set_index('transit_timestamp')['ridership'].resample('D').sum().reset_index()
-weekly = df_station.set_index('transit_timestamp')['ridership'].resample('W').sum().reset_index()
+daily = rollup_index.daily(station_id, date_range[0], date_range[1])  # Daily totals from the cube
+weekly = rollup_index.weekly(station_id, date_range[0], date_range[1])  # Weekly totals from the cube
 
 # Daily ridership line chart
 fig_daily = px.line(daily, x='transit_timestamp', y='ridership', title='Daily Ridership',
@@ -109,7 +178,7 @@ st_folium(m, width=700)  # Render map
 # ---------------------------------------------------
 st.header("7-day Forecast")
 with st.spinner("Training forecasting model..."):
-    ts, forecast = prep_forecast(df_station)  # Prepare time series and forecast
+    ts, forecast = prep_forecast(daily, station_id, date_range, engine=forecast_engine)  # Prepare time series and forecast
 
 # Forecast chart
 fig_fc = px.line(forecast, x='ds', y='yhat', title='7-day Forecast',
@@ -135,7 +204,7 @@ for tab, b in zip(tabs, boroughs):
             df_sel = df_b[df_b['station_complex'].isin(sel)]
             df_plot = (
                 df_sel.set_index('transit_timestamp')
-                      .groupby('station_complex')['ridership']
+                      .groupby('station_complex', observed=True)['ridership']
                       .resample('D').sum().reset_index()
             )
             # Line chart per selected station
@@ -152,8 +221,9 @@ for tab, b in zip(tabs, boroughs):
 # ---------------------------------------------------
 if 'payment_method' in df_station.columns and 'fare_class_category' in df_station.columns:
     rev_df = (
-        df_station.groupby(['payment_method', 'fare_class_category'])['ridership']
+        df_station.groupby(['payment_method', 'fare_class_category'], observed=True)['ridership']
                   .sum().reset_index(name='revenue')  # Aggregate revenue
+                  .astype({'payment_method': str, 'fare_class_category': str})  # Plain labels for the sunburst
     )
     # Sunburst chart
     fig_sf = px.sunburst(
@@ -179,4 +249,25 @@ if 'distance_to_central' in df_station.columns:
     fig_sc.update_layout(xaxis_title='Distance (m)', yaxis_title='Ridership')
     st.plotly_chart(fig_sc, use_container_width=True)
 
-# Note: order of graphs preserved: Hourly, Daily, Weekly, Map, Forecast, Borough, Payment, Distance
+# ---------------------------------------------------
+# 8. Hourly Crowding Forecast (XGBoost, recursive)
+# ---------------------------------------------------
+st.header("Hourly Forecast")
+hourly_forecaster = get_hourly_forecaster(MODEL_PATH, DATA_PATH)
+if hourly_forecaster is None:
+    st.info(f"Train the model (`python train.py --model {MODEL_PATH}`) and export the Parquet master "
+            "to enable hourly forecasts.")
+else:
+    horizon = st.slider("Hours ahead", 24, MAX_HOURS, 48, step=24)
+    with st.spinner("Forecasting all stations..."):
+        hourly_fc = hourly_forecaster.forecast(horizon)  # All stations in one batched recursion (cached)
+    station_fc = hourly_fc[hourly_fc['station_complex_id'] == str(station_id)]
+    recent_h = hourly_forecaster.actuals(station_id, hours=48)  # Last two days of actuals for context
+    fig_hf = px.line(station_fc, x='transit_timestamp', y='ridership', title=f'{horizon}-hour Forecast',
+                     color_discrete_sequence=['#AB63FA'])
+    fig_hf.add_scatter(x=recent_h['transit_timestamp'], y=recent_h['ridership'], mode='lines',
+                       name='Actual', line_color='black')
+    fig_hf.update_layout(xaxis_title='Hour', yaxis_title='Ridership')
+    st.plotly_chart(fig_hf, use_container_width=True)
+
+# Note: order of graphs preserved: Hourly, Daily, Weekly, Map, Forecast, Borough, Payment, Distance, Hourly forecast
@@ -0,0 +1,119 @@
+# ---------------------------------------------------
+# Categorical encoding for model input
+# Replaces dense pd.get_dummies columns with either native pandas categoricals
+# (XGBoost enable_categorical=True) or a SciPy sparse one-hot matrix, using
+# category vocabularies fitted once and saved next to the model.
+# Dependencies (install with pip if needed):
+#   pandas, numpy, scipy
+# ---------------------------------------------------
+import json
+import os
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+CATEGORICAL_COLUMNS = ('Borough', 'Line', 'Status Label')  # The notebook's one-hot columns
+VOCAB_SUFFIX = '.categories.json'
+
+
+def vocab_path(model_path: str) -> str:
+    """Vocabulary file saved alongside a model, e.g. xgb_model.pkl -> xgb_model.categories.json."""
+    return os.path.splitext(model_path)[0] + VOCAB_SUFFIX
+
+
+class CategoryEncoder:
+    """
+    Fitted category vocabularies for a set of columns.
+
+    transform() gives categorical columns with the fitted categories (values not
+    seen during fit become missing), so train, test and serving rows always get
+    the same codes. to_sparse() one-hot encodes them into a CSR matrix without
+    ever materializing dense dummy columns.
+    """
+
+    def __init__(self, columns=None, max_categories: int = None):
+        """
+        Args:
+        - columns (list): Columns to encode (default: every object/string/category column at fit time).
+        - max_categories (int): Keep only the most frequent values per column (the rest become missing).
+        """
+        self.columns = list(columns) if columns is not None else None
+        self.max_categories = max_categories
+        self.vocab = {}
+
+    def fit(self, df: pd.DataFrame) -> 'CategoryEncoder':
+        """Learn each column's categories (sorted, most frequent first when capped)."""
+        columns = self.columns
+        if columns is None:
+            columns = df.select_dtypes(include=['object', 'string', 'category']).columns
+        self.vocab = {}
+        for col in [c for c in columns if c in df.columns]:
+            counts = df[col].astype('string').value_counts(dropna=True)
+            if self.max_categories is not None:
+                counts = counts.iloc[:self.max_categories]
+            self.vocab[col] = sorted(counts.index.tolist())
+        self.columns = list(self.vocab)
+        return self
+
+    def transform(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Copy of df with the encoded columns as fixed-vocabulary categoricals (for enable_categorical)."""
+        out = df.copy()
+        for col, cats in self.vocab.items():
+            if col in out.columns:
+                out[col] = pd.Categorical(out[col].astype('string'), categories=cats)
+        return out
+
+    def fit_transform(self, df: pd.DataFrame) -> pd.DataFrame:
+        return self.fit(df).transform(df)
+
+    def codes(self, df: pd.DataFrame) -> dict:
+        """Column -> int32 category codes (-1 for missing or unseen values, or a column df lacks)."""
+        return {col: pd.Categorical(df[col].astype('string'), categories=cats).codes.astype('int32')
+                if col in df.columns else np.full(len(df), -1, dtype='int32')
+                for col, cats in self.vocab.items()}
+
+    def feature_names(self, numeric_columns=()) -> list:
+        """Column names of to_sparse() output: numeric columns, then '<column>_<category>' indicators."""
+        return list(numeric_columns) + [f"{col}_{cat}" for col, cats in self.vocab.items() for cat in cats]
+
+    def to_sparse(self, df: pd.DataFrame, numeric_columns=None):
+        """
+        CSR matrix of numeric columns followed by one-hot blocks of the encoded columns.
+
+        Args:
+        - df (DataFrame): Rows to encode.
+        - numeric_columns (list): Dense columns to keep (default: every numeric/bool column not encoded).
+
+        Returns:
+        - tuple: (scipy.sparse.csr_matrix float32, list of feature names).
+        """
+        if numeric_columns is None:
+            numeric_columns = [c for c in df.select_dtypes(include=[np.number, 'bool']).columns
+                               if c not in self.vocab]
+        n, k = len(df), len(numeric_columns)
+        dense = df[list(numeric_columns)].to_numpy(dtype='float32', na_value=np.nan)
+        # Explicit zeros: XGBoost reads entries absent from a sparse matrix as missing, not 0
+        blocks = [sparse.csr_matrix((dense.ravel(), np.tile(np.arange(k), n), np.arange(n + 1) * k),
+                                    shape=(n, k))]
+        for col, code in self.codes(df).items():
+            hit = code >= 0
+            rows = np.flatnonzero(hit)
+            blocks.append(sparse.csr_matrix((np.ones(len(rows), dtype='float32'), (rows, code[hit])),
+                                            shape=(n, len(self.vocab[col]))))
+        return sparse.hstack(blocks, format='csr'), self.feature_names(numeric_columns)
+
+    def save(self, path: str) -> None:
+        """Write the vocabularies as JSON (see vocab_path for the file next to a model)."""
+        with open(path, 'w') as f:
+            json.dump({'columns': self.columns, 'max_categories': self.max_categories,
+                       'vocab': self.vocab}, f, indent=1)
+
+    @classmethod
+    def load(cls, path: str) -> 'CategoryEncoder':
+        """Restore an encoder written by save()."""
+        with open(path) as f:
+            payload = json.load(f)
+        encoder = cls(payload['columns'], payload.get('max_categories'))
+        encoder.vocab = payload['vocab']
+        return encoder
@@ -0,0 +1,120 @@
+# ---------------------------------------------------
+# SHAP explanations for the XGBoost ridership model
+# Explains a stratified sample (station / borough / hour) instead of the whole
+# test set, computes exact TreeSHAP values with XGBoost's multi-threaded
+# pred_contribs in parallel batches, and caches them on disk keyed by the
+# model's hash, so global importance and per-row explanations are read back
+# without recomputing.
+# Dependencies (install with pip if needed):
+#   pandas, numpy, pyarrow, xgboost>=2.0 (shap only for its plots)
+# ---------------------------------------------------
+import hashlib
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+
+from train import default_nthread
+
+SHAP_CACHE_DIR = 'shap_cache'
+STRATA = ('station_complex_id', 'Borough', 'hour')
+BATCH_ROWS = 2048  # Rows per pred_contribs call; bounds the (rows x features) output per batch
+BIAS = 'bias'
+
+
+def model_hash(booster: xgb.Booster) -> str:
+    """Content hash of the trained trees (changes whenever the model does)."""
+    return hashlib.sha256(bytes(booster.save_raw('ubj'))).hexdigest()[:16]
+
+
+def stratified_sample(df: pd.DataFrame, n: int = 5000, strata=STRATA, seed: int = 42) -> pd.DataFrame:
+    """
+    Proportional stratified sample of about n rows.
+
+    Each stratum gets n * share rows; fractional quotas are rounded up at
+    random with probability equal to the fraction, so small strata are still
+    represented in expectation. Strata columns missing from df are ignored.
+
+    Returns:
+    - DataFrame: The sampled rows (original index kept), in df order.
+    """
+    if len(df) <= n:
+        return df
+    rng = np.random.default_rng(seed)
+    cols = [c for c in strata if c in df.columns]
+    if not cols:
+        return df.iloc[np.sort(rng.choice(len(df), n, replace=False))]
+    group = df.groupby(cols, observed=True, sort=False, dropna=False).ngroup().to_numpy()
+    sizes = np.bincount(group)
+    quota = sizes * (n / len(df))
+    quota = np.floor(quota + rng.random(len(quota))).astype('int64')  # Randomized rounding
+    order = np.lexsort((rng.random(len(df)), group))  # Random order within each stratum
+    starts = np.r_[0, np.cumsum(sizes)[:-1]]
+    rank = np.empty(len(df), dtype='int64')
+    rank[order] = np.arange(len(df)) - np.repeat(starts, sizes)
+    return df.iloc[np.flatnonzero(rank < quota[group])]
+
+
+def shap_values(booster: xgb.Booster, X: pd.DataFrame, batch_rows: int = BATCH_ROWS,
+                workers: int = None) -> pd.DataFrame:
+    """
+    Exact TreeSHAP contributions (same values as shap.TreeExplainer) in parallel batches.
+
+    Returns:
+    - DataFrame: One column per feature plus 'bias' (expected value); rows sum to the prediction.
+    """
+    best = getattr(booster, 'best_iteration', None)
+    iteration_range = (0, best + 1) if best is not None else (0, 0)
+    batches = [X.iloc[i:i + batch_rows] for i in range(0, len(X), batch_rows)]
+    workers = workers or max(1, min(len(batches), default_nthread()))
+    nthread = max(1, default_nthread() // workers)
+
+    def run(batch):
+        data = xgb.DMatrix(batch, enable_categorical=True, nthread=nthread)
+        return booster.predict(data, pred_contribs=True, iteration_range=iteration_range)
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        values = np.vstack(list(pool.map(run, batches))) if batches else np.empty((0, X.shape[1] + 1))
+    return pd.DataFrame(values, index=X.index, columns=list(X.columns) + [BIAS])
+
+
+def _cache_path(cache_dir: str, booster: xgb.Booster, X: pd.DataFrame) -> str:
+    rows = hashlib.sha256(pd.util.hash_pandas_object(X, index=True).to_numpy().tobytes()).hexdigest()[:16]
+    return os.path.join(cache_dir, model_hash(booster), f"{rows}.parquet")
+
+
+def explain(booster: xgb.Booster, X: pd.DataFrame, cache_dir: str = SHAP_CACHE_DIR, **kwargs) -> pd.DataFrame:
+    """
+    SHAP values for X, read from <cache_dir>/<model hash>/<rows hash>.parquet when present.
+
+    Args:
+    - booster (xgb.Booster): Trained model.
+    - X (DataFrame): Encoded feature rows (e.g. a stratified_sample of the test set).
+    - cache_dir (str): Cache root; None disables caching.
+
+    Returns:
+    - DataFrame: As shap_values.
+    """
+    path = _cache_path(cache_dir, booster, X) if cache_dir else None
+    if path and os.path.exists(path):
+        return pd.read_parquet(path)
+    values = shap_values(booster, X, **kwargs)
+    if path:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        values.to_parquet(path + '.tmp')
+        os.replace(path + '.tmp', path)  # Atomic, so readers never see a partial file
+    return values
+
+
+def global_importance(values: pd.DataFrame) -> pd.Series:
+    """Mean |SHAP| per feature, largest first."""
+    return values.drop(columns=BIAS).abs().mean().sort_values(ascending=False)
+
+
+def explain_row(values: pd.DataFrame, X: pd.DataFrame, row) -> pd.DataFrame:
+    """Per-feature value and contribution for one row (index label), largest |contribution| first."""
+    contrib = values.loc[row].drop(BIAS)
+    out = pd.DataFrame({'value': X.loc[row, contrib.index], 'shap': contrib})
+    return out.reindex(out['shap'].abs().sort_values(ascending=False).index)
@@ -0,0 +1,106 @@
+# ---------------------------------------------------
+# Correlation-based feature pruning
+# Correlation matrix from float32 chunk Gram matrices (one BLAS matrix product
+# per chunk, accumulated in float64) over a row sample or a stream of chunks,
+# a vectorized drop rule, and a saved drop list that training and inference
+# apply to the same columns.
+# Dependencies (install with pip if needed):
+#   pandas, numpy
+# ---------------------------------------------------
+import json
+
+import numpy as np
+import pandas as pd
+
+DROP_LIST = 'feature_drop_list.json'
+CHUNK_ROWS = 500_000  # Rows per Gram-matrix update
+
+
+def _chunks(data, chunk_rows: int):
+    if isinstance(data, pd.DataFrame):
+        for start in range(0, len(data), chunk_rows):
+            yield data.iloc[start:start + chunk_rows]
+    else:
+        yield from data  # Any iterable of DataFrames (e.g. pd.read_csv(..., chunksize=...))
+
+
+def correlation_matrix(data, columns=None, sample_rows: int = 1_000_000, chunk_rows: int = CHUNK_ROWS,
+                       seed: int = 42) -> pd.DataFrame:
+    """
+    Pearson correlation of numeric columns from streamed float32 Gram matrices.
+
+    Each chunk is shifted by the first chunk's column means (keeps float32
+    products well conditioned), then X.T @ X, column sums and counts are
+    accumulated in float64. Missing values count as the shift value, i.e.
+    they contribute nothing to the covariance (pandas' corr() drops them per pair).
+
+    Args:
+    - data (DataFrame | iterable of DataFrames): Rows to use.
+    - columns (list): Columns to correlate (default: numeric, non-bool columns of the first chunk).
+    - sample_rows (int): For a DataFrame, use a uniform sample of at most this many rows (None: all rows).
+    - chunk_rows (int): Rows per chunk when data is a DataFrame.
+
+    Returns:
+    - DataFrame: Square correlation matrix (float64), NaN for constant columns.
+    """
+    if isinstance(data, pd.DataFrame) and sample_rows is not None and len(data) > sample_rows:
+        rng = np.random.default_rng(seed)
+        data = data.iloc[np.sort(rng.choice(len(data), sample_rows, replace=False))]
+
+    columns = list(columns) if columns is not None else None
+    gram = sums = shift = None
+    n = 0
+    for chunk in _chunks(data, chunk_rows):
+        if columns is None:
+            columns = list(chunk.select_dtypes(include=[np.number]).columns)
+        X = chunk[columns].to_numpy(dtype='float32', na_value=np.nan)
+        if shift is None:
+            shift = np.nan_to_num(np.nanmean(X, axis=0)) if len(X) else np.zeros(len(columns), 'float32')
+            gram = np.zeros((len(columns), len(columns)))
+            sums = np.zeros(len(columns))
+        X = np.nan_to_num(X - shift)  # Missing -> shift value
+        gram += X.T @ X  # float32 sgemm
+        sums += X.sum(axis=0, dtype='float64')
+        n += len(X)
+
+    if n < 2:
+        return pd.DataFrame(np.nan, index=columns or [], columns=columns or [])
+    cov = (gram - np.outer(sums, sums) / n) / (n - 1)
+    std = np.sqrt(np.clip(np.diag(cov), 0, None))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        corr = cov / np.outer(std, std)
+    corr[std == 0, :] = np.nan
+    corr[:, std == 0] = np.nan
+    np.fill_diagonal(corr, np.where(std > 0, 1.0, np.nan))
+    return pd.DataFrame(np.clip(corr, -1, 1), index=columns, columns=columns)
+
+
+def correlated_features(corr: pd.DataFrame, threshold: float = 0.8, absolute: bool = False) -> list:
+    """
+    Columns to drop: those correlated above threshold with any earlier column.
+
+    Same rule as the notebook's upper-triangle scan (absolute=True also drops
+    strongly negative pairs), as one vectorized comparison.
+    """
+    values = corr.to_numpy()
+    values = np.abs(values) if absolute else values
+    upper = np.triu(np.nan_to_num(values, nan=-np.inf) > threshold, k=1)
+    return [c for c, drop in zip(corr.columns, upper.any(axis=0)) if drop]
+
+
+def save_drop_list(drop: list, path: str = DROP_LIST, threshold: float = None, columns=None) -> None:
+    """Record the drop list (with the threshold and candidate columns) for training and inference."""
+    with open(path, 'w') as f:
+        json.dump({'threshold': threshold, 'columns': [] if columns is None else list(columns),
+                   'drop': list(drop)}, f, indent=1)
+
+
+def load_drop_list(path: str = DROP_LIST) -> list:
+    """Columns recorded by save_drop_list."""
+    with open(path) as f:
+        return json.load(f)['drop']
+
+
+def apply_drop_list(df: pd.DataFrame, drop: list) -> pd.DataFrame:
+    """df without the dropped columns (columns it lacks are ignored)."""
+    return df.drop(columns=[c for c in drop if c in df.columns])
@@ -0,0 +1,193 @@
+# ---------------------------------------------------
+# Per-station time-window features
+# Calendar lags and rolling mean/std/min/max of ridership over several
+# trailing time windows, computed per station over one sorted array (windows
+# never cross stations and gaps in the hourly data shrink the window instead
+# of stretching it; a lag with no row at exactly t - lag is missing).
+# Dependencies (install with pip if needed):
+#   pandas, numpy
+# ---------------------------------------------------
+import numpy as np
+import pandas as pd
+
+KEY = 'station_complex_id'
+TIME = 'transit_timestamp'
+# Columns that, with the station, identify one hourly series (one row per hour)
+SERIES = ('payment_method', 'fare_class_category')
+
+LAGS = (1, 2, 24, 168)  # Hours back: previous hours, same hour yesterday, same hour last week
+
+# Feature label -> trailing window length
+ROLL_WINDOWS = {'3h': '3h', '24h': '24h', '7d': '7D', '28d': '28D'}
+ROLL_STATS = ('mean', 'std', 'min', 'max')
+
+
+def roll_column(stat: str, label: str, value: str = 'ridership') -> str:
+    """Feature name, e.g. ridership_roll_mean_24h."""
+    return f"{value}_roll_{stat}_{label}"
+
+
+def lag_column(hours: int, value: str = 'ridership') -> str:
+    """Feature name, e.g. ridership_lag_24."""
+    return f"{value}_lag_{hours}"
+
+
+def _sorted_keys(df: pd.DataFrame, key, time: str):
+    """
+    Sort order (None when already sorted) and sorted composite (group, second) keys.
+
+    The group code (station, or one code per combination of the `key` columns)
+    sits in the high 32 bits and the epoch second in the low bits, so one
+    searchsorted over the key finds window edges that can never reach into the
+    neighbouring group.
+    """
+    if isinstance(key, str):
+        codes = pd.factorize(df[key], sort=True)[0].astype('int64')
+    else:
+        codes = df.groupby(list(key), sort=True, observed=True, dropna=False).ngroup().to_numpy('int64')
+    secs = pd.to_datetime(df[time]).to_numpy().astype('datetime64[s]').astype('int64')
+    composite = (codes << 32) + (secs - secs.min())
+    if len(composite) and (np.diff(composite) >= 0).all():
+        return None, composite  # Already sorted by station and time
+    order = np.argsort(composite, kind='stable')
+    return order, composite[order]
+
+
+def rolling_features(df: pd.DataFrame, windows: dict = ROLL_WINDOWS, stats=ROLL_STATS,
+                     value: str = 'ridership', key: str = KEY, time: str = TIME,
+                     fill: bool = True, fill_value: float = None) -> pd.DataFrame:
+    """
+    Trailing time-window statistics of `value` per station.
+
+    The window for a row at time t covers the same station's rows with
+    t - window <= timestamp < t, so other rows of the same hour (payment
+    methods, fare classes) are excluded just like the current one.
+    Mean and std come from prefix sums over the sorted array; min and max
+    use pandas' grouped time-based rolling on the same sorted frame.
+
+    Args:
+    - df (DataFrame): Rows with station key, timestamp and value columns (any order).
+    - windows (dict): Label -> pandas offset string.
+    - stats (tuple): Any of 'mean', 'std', 'min', 'max'.
+    - fill (bool): Fill empty windows like the notebook (median value, std 0).
+    - fill_value (float): Value for empty mean/min/max windows (default: median of `value`).
+
+    Returns:
+    - DataFrame: One column per (stat, window), aligned with df.index.
+    """
+    order, composite = _sorted_keys(df, key, time)
+    x = pd.to_numeric(df[value], errors='coerce').to_numpy(dtype='float64')
+    if order is not None:
+        x = x[order]
+    center = np.nanmean(x) if len(x) else 0.0
+    xc = np.nan_to_num(x - center)  # Centered values keep the prefix sums well conditioned
+    valid = ~np.isnan(x)
+    cs = np.concatenate([[0.0], np.cumsum(xc)])
+    cs2 = np.concatenate([[0.0], np.cumsum(xc * xc)])
+    cn = np.concatenate([[0], np.cumsum(valid)])
+    right = np.searchsorted(composite, composite, side='left')  # First row of the current timestamp
+
+    out = {}
+    sorted_frame = None
+    for label, window in windows.items():
+        w = int(pd.Timedelta(window).total_seconds())
+        left = np.searchsorted(composite, composite - w, side='left')
+        n = (cn[right] - cn[left]).astype('float64')
+        with np.errstate(invalid='ignore', divide='ignore'):
+            s = cs[right] - cs[left]
+            mean_c = s / n
+            if 'mean' in stats:
+                out[roll_column('mean', label, value)] = mean_c + center
+            if 'std' in stats:
+                var = (cs2[right] - cs2[left] - n * mean_c ** 2) / (n - 1)
+                std = np.sqrt(np.clip(var, 0, None))
+                std[n < 2] = np.nan  # Sample std needs two observations
+                out[roll_column('std', label, value)] = std
+        if 'min' in stats or 'max' in stats:
+            if sorted_frame is None:
+                sorted_frame = pd.DataFrame({
+                    '_g': composite >> 32,
+                    TIME: pd.to_datetime(df[time]).to_numpy() if order is None
+                    else pd.to_datetime(df[time]).to_numpy()[order],
+                    '_x': x,
+                })
+            rolled = (sorted_frame.groupby('_g', sort=True)
+                                  .rolling(window, on=TIME, closed='left')['_x'])
+            for stat in ('min', 'max'):
+                if stat in stats:
+                    out[roll_column(stat, label, value)] = getattr(rolled, stat)().to_numpy()
+
+    result = pd.DataFrame(out)
+    if fill:
+        if fill_value is None:
+            fill_value = np.nanmedian(x) if len(x) else 0.0
+        for col in result.columns:
+            result[col] = result[col].fillna(0.0 if '_roll_std_' in col else fill_value)
+    if order is None:
+        return result.set_axis(df.index)
+    # Scatter back from sorted order to the caller's row order
+    aligned = np.empty_like(result.to_numpy())
+    aligned[order] = result.to_numpy()
+    return pd.DataFrame(aligned, index=df.index, columns=result.columns)
+
+
+def lag_features(df: pd.DataFrame, lags=LAGS, value: str = 'ridership', key: str = KEY,
+                 time: str = TIME, series=SERIES, fill: bool = True, fill_value: float = None) -> pd.DataFrame:
+    """
+    Calendar lags of `value`: the same series' value exactly `lag` hours earlier.
+
+    All lags share one sort and one group-code array; each lag is a single
+    searchsorted for t - lag on the composite key. Missing hours give NaN
+    instead of silently taking an older row.
+
+    Args:
+    - df (DataFrame): Rows with station key, timestamp and value columns (any order).
+    - lags (tuple): Lags in hours.
+    - series (tuple): Extra columns that split a station into hourly series
+      (those missing from df are ignored).
+    - fill (bool): Fill missing lags with fill_value, as the notebook did.
+    - fill_value (float): Default: median of `value`.
+
+    Returns:
+    - DataFrame: One ridership_lag_<hours> column per lag, aligned with df.index.
+    """
+    group = [key] + [c for c in series if c in df.columns]
+    order, composite = _sorted_keys(df, key if len(group) == 1 else group, time)
+    x = pd.to_numeric(df[value], errors='coerce').to_numpy(dtype='float64')
+    if order is not None:
+        x = x[order]
+
+    out = {}
+    for hours in lags:
+        target = composite - int(hours) * 3600
+        pos = np.searchsorted(composite, target, side='left')
+        hit = pos < len(composite)
+        hit[hit] = composite[pos[hit]] == target[hit]
+        out[lag_column(hours, value)] = np.where(hit, x[np.minimum(pos, len(x) - 1)], np.nan)
+
+    result = pd.DataFrame(out)
+    if fill:
+        if fill_value is None:
+            fill_value = np.nanmedian(x) if len(x) else 0.0
+        result = result.fillna(fill_value)
+    if order is None:
+        return result.set_axis(df.index)
+    aligned = np.empty_like(result.to_numpy())
+    aligned[order] = result.to_numpy()
+    return pd.DataFrame(aligned, index=df.index, columns=result.columns)
+
+
+def add_lag_features(df: pd.DataFrame, **kwargs) -> pd.DataFrame:
+    """Attach lag_features(df) as new columns of df (in place) and return df."""
+    feats = lag_features(df, **kwargs)
+    for col in feats.columns:
+        df[col] = feats[col]
+    return df
+
+
+def add_rolling_features(df: pd.DataFrame, **kwargs) -> pd.DataFrame:
+    """Attach rolling_features(df) as new columns of df (in place) and return df."""
+    feats = rolling_features(df, **kwargs)
+    for col in feats.columns:
+        df[col] = feats[col]
+    return df
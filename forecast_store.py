@@ -0,0 +1,96 @@
+# ---------------------------------------------------
+# Persistent forecast cache
+# Stores fitted models and their forecasts on disk keyed by
+# (station, date range, horizon, data version, engine) with LRU eviction.
+# Dependencies (install with pip if needed):
+#   pandas, pyarrow
+# ---------------------------------------------------
+import hashlib
+import json
+import os
+import shutil
+import time
+
+import pandas as pd
+
+from forecasting import DEFAULT_ENGINE
+
+FORECAST_STORE_DIR = "forecast_store"  # Default cache directory
+
+
+def series_fingerprint(ts: pd.DataFrame) -> str:
+    """
+    Cheap data version of a daily series.
+
+    Hashes the few hundred (ds, y) values of the daily history rather than the
+    hourly station frame, so computing the key costs microseconds.
+    """
+    h = hashlib.sha1()
+    h.update(pd.to_datetime(ts['ds']).to_numpy().astype('datetime64[D]').tobytes())
+    h.update(ts['y'].to_numpy(dtype='float64').tobytes())
+    return h.hexdigest()[:16]
+
+
+class ForecastStore:
+    """
+    Directory of cached forecasts, one sub-directory per key.
+
+    Layout: <root>/<key>/forecast.parquet, model.json (optional), meta.json.
+    The directory mtime records the last access and drives LRU eviction.
+    """
+
+    def __init__(self, root: str = FORECAST_STORE_DIR, max_entries: int = 256):
+        self.root = root
+        self.max_entries = max_entries
+        os.makedirs(root, exist_ok=True)
+
+    @staticmethod
+    def key(station_id, start, end, days: int, data_version: str, engine: str = DEFAULT_ENGINE) -> str:
+        """Stable cache key for one forecast request (per forecasting engine)."""
+        raw = json.dumps([str(station_id), str(start), str(end), int(days), data_version, engine])
+        return hashlib.sha1(raw.encode()).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, key)
+
+    def get(self, key: str):
+        """Return the cached forecast DataFrame, or None on a miss."""
+        path = self._path(key)
+        try:
+            forecast = pd.read_parquet(os.path.join(path, 'forecast.parquet'))
+        except (FileNotFoundError, OSError):
+            return None
+        os.utime(path)  # Mark as recently used
+        return forecast
+
+    def get_model(self, key: str):
+        """Return the serialized model stored with key, or None."""
+        path = os.path.join(self._path(key), 'model.json')
+        if not os.path.exists(path):
+            return None
+        with open(path) as f:
+            return f.read()
+
+    def put(self, key: str, forecast: pd.DataFrame, model_json: str = None, meta: dict = None) -> None:
+        """Store a forecast (and optionally its serialized model), then evict old entries."""
+        path = self._path(key)
+        tmp = f"{path}.tmp-{os.getpid()}"
+        os.makedirs(tmp, exist_ok=True)
+        forecast.to_parquet(os.path.join(tmp, 'forecast.parquet'), index=False)
+        if model_json is not None:
+            with open(os.path.join(tmp, 'model.json'), 'w') as f:
+                f.write(model_json)
+        with open(os.path.join(tmp, 'meta.json'), 'w') as f:
+            json.dump({**(meta or {}), 'created': time.time()}, f)
+        shutil.rmtree(path, ignore_errors=True)
+        os.replace(tmp, path)  # Readers never see a half-written entry
+        self.evict()
+
+    def evict(self) -> None:
+        """Drop the least recently used entries beyond max_entries."""
+        entries = [e for e in os.scandir(self.root) if e.is_dir() and '.tmp-' not in e.name]
+        if len(entries) <= self.max_entries:
+            return
+        entries.sort(key=lambda e: e.stat().st_mtime)
+        for e in entries[:len(entries) - self.max_entries]:
+            shutil.rmtree(e.path, ignore_errors=True)
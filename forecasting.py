@@ -0,0 +1,171 @@
+# ---------------------------------------------------
+# Station-level ridership forecasting
+# Shared by the dashboard and offline jobs so every caller fits the same model.
+# Two engines:
+#   fourier - linear trend + weekly (and, with 2+ years of history, yearly)
+#             Fourier terms, fitted for any number of stations at once as one
+#             batched least-squares solve (milliseconds for all stations)
+#   prophet - Prophet with weekly seasonality, the slower, more flexible mode
+# Both return Prophet-style forecasts (ds, yhat, yhat_lower, yhat_upper over
+# the history plus the horizon), so callers don't care which one ran.
+# Dependencies (install with pip if needed):
+#   pandas, numpy (prophet only for the prophet engine)
+# ---------------------------------------------------
+import json
+from statistics import NormalDist
+
+import numpy as np
+import pandas as pd
+
+ENGINES = ('fourier', 'prophet')
+DEFAULT_ENGINE = 'fourier'
+WEEKLY_ORDER = 3  # Prophet's default Fourier orders
+YEARLY_ORDER = 10
+YEARLY_MIN_DAYS = 730  # Like Prophet, fit yearly seasonality only with two years of history
+INTERVAL_WIDTH = 0.8  # Prophet's default uncertainty interval
+RIDGE = 1e-6  # Relative ridge on the normal equations; keeps short series solvable
+
+
+def daily_series(daily: pd.DataFrame) -> pd.DataFrame:
+    """Rename a daily rollup (transit_timestamp, ridership) to Prophet's ds / y columns."""
+    return (
+        daily[['transit_timestamp', 'ridership']]
+        .rename(columns={'transit_timestamp': 'ds', 'ridership': 'y'})
+        .reset_index(drop=True)
+    )
+
+
+def fit_prophet_forecast(ts: pd.DataFrame, days: int = 7):
+    """
+    Fit Prophet on a daily series and forecast the next `days` days.
+
+    Args:
+    - ts (DataFrame): Daily history with 'ds' and 'y' columns.
+    - days (int): Forecast horizon in days.
+
+    Returns:
+    - tuple: (fitted Prophet model, forecast DataFrame)
+    """
+    from prophet import Prophet  # Imported lazily, fitting is the only place that needs it
+    m = Prophet(daily_seasonality=False, weekly_seasonality=True)  # Daily rows: no intra-day seasonality to fit
+    m.fit(ts)  # Fit model
+    future = m.make_future_dataframe(periods=days)  # Create future dataframe
+    forecast = m.predict(future)  # Predict future ridership
+    return m, forecast
+
+
+def design_matrix(t: np.ndarray, weekly_order: int = WEEKLY_ORDER, yearly_order: int = YEARLY_ORDER) -> np.ndarray:
+    """
+    Regressors for days t (days since the series origin, as floats).
+
+    Columns: intercept, trend (years), then sin/cos pairs of the weekly and yearly terms.
+    """
+    cols = [np.ones_like(t), t / 365.25]
+    for period, order in ((7.0, weekly_order), (365.25, yearly_order)):
+        for k in range(1, order + 1):
+            angle = 2 * np.pi * k * t / period
+            cols += [np.sin(angle), np.cos(angle)]
+    return np.column_stack(cols)
+
+
+def fit_fourier_batch(history: pd.DataFrame, days: int = 7, weekly_order: int = WEEKLY_ORDER,
+                      yearly_order: int = YEARLY_ORDER, interval_width: float = INTERVAL_WIDTH):
+    """
+    Fit the Fourier model for many stations with one batched solve.
+
+    All series share one daily grid and one design matrix; each station's
+    normal equations (X'WX) b = X'Wy use its own observation mask W, so gaps
+    and different history lengths are handled without a per-station loop.
+    Stations with less than YEARLY_MIN_DAYS of history get their yearly terms
+    penalized to zero.
+
+    Args:
+    - history (DataFrame): Long daily history with station_complex_id, ds and y (one row per station-day).
+    - days (int): Forecast horizon in days.
+    - interval_width (float): Coverage of yhat_lower / yhat_upper (normal residuals).
+
+    Returns:
+    - tuple: ({station: model dict}, forecast DataFrame with station_complex_id, ds, yhat, yhat_lower, yhat_upper)
+    """
+    history = history.dropna(subset=['y'])
+    if history.empty:
+        return {}, pd.DataFrame(columns=['station_complex_id', 'ds', 'yhat', 'yhat_lower', 'yhat_upper'])
+    station, ids = pd.factorize(history['station_complex_id'], sort=True)
+    day = pd.to_datetime(history['ds']).to_numpy().astype('datetime64[D]')
+    origin = day.min()
+    t_obs = (day - origin).astype('int64')
+    first = np.full(len(ids), t_obs.max())
+    np.minimum.at(first, station, t_obs)
+    end = np.zeros(len(ids), dtype='int64')
+    np.maximum.at(end, station, t_obs)
+    n_days = int(end.max()) + days + 1
+
+    Y = np.full((n_days, len(ids)), np.nan)
+    Y[t_obs, station] = history['y'].to_numpy(dtype='float64')
+    W = ~np.isnan(Y)
+    X = design_matrix(np.arange(n_days, dtype='float64'), weekly_order, yearly_order)
+    p = X.shape[1]
+
+    # Every station's X'WX from one matrix product: (p*p, T) @ (T, S)
+    gram = ((X[:, :, None] * X[:, None, :]).reshape(n_days, p * p).T @ W).T.reshape(len(ids), p, p)
+    rhs = X.T @ np.where(W, Y, 0.0)
+    n_obs = W.sum(axis=0)
+    penalty = np.full((len(ids), p), RIDGE) * np.maximum(n_obs, 1)[:, None]
+    short = (end - first) < YEARLY_MIN_DAYS
+    penalty[np.ix_(short, np.arange(2 + 2 * weekly_order, p))] = 1e9 * np.maximum(n_obs[short], 1)[:, None]
+    gram[:, np.arange(p), np.arange(p)] += penalty
+    coef = np.linalg.solve(gram, rhs.T[:, :, None])[:, :, 0]  # (S, p)
+
+    fitted = X @ coef.T
+    resid = np.where(W, Y - fitted, 0.0)
+    sigma = np.sqrt((resid ** 2).sum(axis=0) / np.maximum(n_obs - p, 1))
+    z = NormalDist().inv_cdf((1 + interval_width) / 2)
+
+    # Prophet-style rows: each station's observed days, then `days` days after its last one
+    t = np.arange(n_days)[:, None]
+    keep = W | ((t > end) & (t <= end + days))
+    rows, cols = np.nonzero(keep)
+    order = np.lexsort((rows, cols))
+    rows, cols = rows[order], cols[order]
+    yhat = fitted[rows, cols]
+    forecast = pd.DataFrame({
+        'station_complex_id': np.asarray(ids)[cols],
+        'ds': pd.to_datetime(origin + rows.astype('timedelta64[D]')),
+        'yhat': yhat, 'yhat_lower': yhat - z * sigma[cols], 'yhat_upper': yhat + z * sigma[cols],
+    })
+    models = {s: {'engine': 'fourier', 'origin': str(origin), 'weekly_order': weekly_order,
+                  'yearly_order': yearly_order, 'coef': coef[j].tolist(), 'sigma': float(sigma[j])}
+              for j, s in enumerate(ids)}
+    return models, forecast
+
+
+def fit_fourier_forecast(ts: pd.DataFrame, days: int = 7):
+    """Single-station fit_fourier_batch, with fit_prophet_forecast's (model, forecast) return."""
+    models, forecast = fit_fourier_batch(ts.assign(station_complex_id=0), days)
+    return models.get(0), forecast.drop(columns='station_complex_id')
+
+
+def fit_forecast(ts: pd.DataFrame, days: int = 7, engine: str = DEFAULT_ENGINE):
+    """Fit the chosen engine ('fourier' or 'prophet') on a daily series; returns (model, forecast)."""
+    if engine == 'fourier':
+        return fit_fourier_forecast(ts, days)
+    if engine == 'prophet':
+        return fit_prophet_forecast(ts, days)
+    raise ValueError(f"Unknown forecast engine {engine!r}, expected one of {ENGINES}")
+
+
+def model_to_json(model) -> str:
+    """Serialize a fitted model (Fourier coefficients or Prophet)."""
+    if isinstance(model, dict):
+        return json.dumps(model)
+    from prophet.serialize import model_to_json as _to_json
+    return _to_json(model)
+
+
+def model_from_json(payload: str):
+    """Restore a model serialized with model_to_json."""
+    model = json.loads(payload)
+    if model.get('engine') == 'fourier':
+        return model
+    from prophet.serialize import model_from_json as _from_json
+    return _from_json(payload)
@@ -0,0 +1,63 @@
+# ---------------------------------------------------
+# Vectorized great-circle distances
+# Computes distance_to_central once per distinct station with NumPy and
+# broadcasts the result back to every hourly row.
+# Dependencies (install with pip if needed):
+#   pandas, numpy
+# ---------------------------------------------------
+import numpy as np
+import pandas as pd
+
+EARTH_RADIUS_M = 6_371_008.8  # Mean Earth radius (IUGG)
+TIMES_SQUARE = (40.7580, -73.9855)  # Central point used for distance_to_central
+
+
+def haversine_m(lat, lon, lat0: float, lon0: float) -> np.ndarray:
+    """
+    Haversine distance in meters from each (lat, lon) to (lat0, lon0).
+
+    Within New York City this differs from geopy's ellipsoidal geodesic by
+    well under 0.5%, which is far below the resolution the features need.
+    """
+    lat = np.radians(np.asarray(lat, dtype='float64'))
+    lon = np.radians(np.asarray(lon, dtype='float64'))
+    lat0, lon0 = np.radians(lat0), np.radians(lon0)
+    a = np.sin((lat - lat0) / 2) ** 2 + np.cos(lat) * np.cos(lat0) * np.sin((lon - lon0) / 2) ** 2
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(a))
+
+
+def valid_coordinates(df: pd.DataFrame, lat_col: str = 'Latitude', lon_col: str = 'Longitude') -> pd.Series:
+    """Rows whose coordinates are present and inside the valid lat/lon range."""
+    lat, lon = df[lat_col], df[lon_col]
+    return lat.between(-90, 90) & lon.between(-180, 180)  # NaN compares False
+
+
+def distance_to_point(df: pd.DataFrame, point=TIMES_SQUARE, lat_col: str = 'Latitude',
+                      lon_col: str = 'Longitude', key: str = 'station_complex_id') -> pd.Series:
+    """
+    Distance in meters from every row's station to `point`.
+
+    Distances are computed once per distinct (station, lat, lon) and broadcast
+    back through the factorized codes, so the cost scales with the number of
+    stations rather than the number of hourly rows.
+
+    Args:
+    - df (DataFrame): Rows with station key and coordinate columns.
+    - point (tuple): (lat, lon) of the reference point.
+    - lat_col, lon_col (str): Coordinate columns.
+    - key (str): Station identifier column.
+
+    Returns:
+    - Series: Distances aligned with df.index (NaN where coordinates are invalid).
+    """
+    lat = pd.to_numeric(df[lat_col], errors='coerce')
+    lon = pd.to_numeric(df[lon_col], errors='coerce')
+    coords = pd.DataFrame({key: df[key].values, lat_col: lat.values, lon_col: lon.values}, index=df.index)
+    valid = valid_coordinates(coords, lat_col, lon_col)
+
+    codes, uniques = pd.MultiIndex.from_frame(coords.loc[valid]).factorize()
+    per_station = haversine_m(uniques.get_level_values(1), uniques.get_level_values(2), *point)  # levels: key, lat, lon
+
+    out = pd.Series(np.nan, index=df.index, name='distance_to_central')
+    out[valid.values] = per_station[codes]
+    return out
@@ -0,0 +1,227 @@
+# ---------------------------------------------------
+# Hourly ridership forecasts from the XGBoost model
+# Runs the saved model recursively 24-168 hours ahead for every station at
+# once: each step predicts the next hour of every active (station, payment
+# method, fare class) series in one inplace_predict call, and the predictions
+# become the history the next step's lag and rolling features are read from.
+# History is kept as dense (station x hour) aggregates with prefix sums, so a
+# step's features are a few array slices rather than a per-row loop. Results
+# are cached in memory and in the on-disk forecast store, keyed by the model
+# and the history they were computed from.
+# Usage:
+#   python hourly_forecast.py --model xgb_model.json --master master_df.parquet --hours 168 --output hourly.parquet
+# Dependencies (install with pip if needed):
+#   pandas, numpy, pyarrow, xgboost>=2.0
+# ---------------------------------------------------
+import argparse
+import hashlib
+import time
+
+import numpy as np
+import pandas as pd
+
+from explain import model_hash
+from features import KEY, LAGS, ROLL_STATS, ROLL_WINDOWS, SERIES, TIME, lag_column, roll_column
+from forecast_store import ForecastStore
+from master_build import read_state
+from master_store import MASTER_PARQUET_DIR, load_master, master_date_bounds
+from serve import HORIZON, MODEL_PATH, load_artifacts
+
+ENGINE = 'xgboost_hourly'
+MAX_HOURS = 168
+ACTIVE_HOURS = 168  # Series seen within this many hours of the end of history are forecast
+_WINDOW_HOURS = {label: int(pd.Timedelta(w) / pd.Timedelta(hours=1)) for label, w in ROLL_WINDOWS.items()}
+
+
+class HourlyForecaster:
+    """
+    Recursive multi-station hourly forecasts.
+
+    Features follow serve.HistoryStore: a rolling window covers the station's
+    rows in [t - window, t), a lag is the same series' value exactly `lag`
+    hours earlier, and missing values get the same fills. Station attributes
+    (location, borough, alert flags, ...) stay at the station's latest row, as
+    Predictor's defaults do.
+    """
+
+    def __init__(self, model_path: str = MODEL_PATH, master_root: str = MASTER_PARQUET_DIR, nthread: int = None,
+                 store: ForecastStore = None, active_hours: int = ACTIVE_HOURS):
+        self.booster, self.pre, self.iteration_range = load_artifacts(model_path, nthread=nthread)
+        self.store = store
+        self.active_hours = active_hours
+        self._cache = {}
+        _, last = master_date_bounds(master_root)
+        recent = load_master(master_root, date_range=(pd.Timestamp(last) - HORIZON, last))
+        self.set_history(recent, read_state(master_root).get('ridership_median'))
+
+    def set_history(self, recent: pd.DataFrame, fill_value: float = None) -> None:
+        """
+        Index recent master rows (at least HORIZON of them) as the forecast's starting history.
+
+        Args:
+        - recent (DataFrame): Master rows, all model features plus ridership.
+        - fill_value (float): Fill for missing lag / rolling values (default: median ridership).
+        """
+        recent = recent.sort_values(TIME, kind='stable')
+        series_cols = [KEY, *[c for c in SERIES if c in recent.columns]]
+        self.fill_value = float(recent['ridership'].median() if fill_value is None else fill_value)
+        hours = pd.to_datetime(recent[TIME]).dt.floor('h')
+        self.start = hours.min()
+        self.end = hours.max()
+        self.n_hist = int((self.end - self.start) / pd.Timedelta(hours=1)) + 1
+        col = ((hours - self.start) / pd.Timedelta(hours=1)).to_numpy().astype('int64')
+        value = pd.to_numeric(recent['ridership'], errors='coerce').to_numpy(dtype='float64')
+        station, self.stations = pd.factorize(recent[KEY].astype(str), sort=True)
+        n_cols = self.n_hist + MAX_HOURS
+
+        # Station x hour aggregates of every row (windows are per station) and their prefix sums
+        observed = ~np.isnan(value)
+        n_s = len(self.stations)
+        agg = {}
+        for name, weights in (('sum', value), ('sq', value ** 2), ('cnt', np.ones_like(value))):
+            flat = np.bincount(station[observed] * n_cols + col[observed], weights[observed], n_s * n_cols)
+            agg[name] = flat.reshape(n_s, n_cols)
+        self._prefix = {name: np.concatenate([np.zeros((n_s, 1)), np.cumsum(a, axis=1)], axis=1)
+                        for name, a in agg.items()}
+        self._min = np.full((n_s, n_cols), np.inf)
+        self._max = np.full((n_s, n_cols), -np.inf)
+        np.minimum.at(self._min, (station[observed], col[observed]), value[observed])
+        np.maximum.at(self._max, (station[observed], col[observed]), value[observed])
+
+        # Series rows: each (station, series) seen recently. As in serve.Predictor, the model input
+        # starts from the station's latest row and only the series fields are overwritten
+        last_seen = recent.groupby(series_cols, sort=True, observed=True)[TIME].max().reset_index()
+        active = last_seen[pd.to_datetime(last_seen[TIME]) > self.end - pd.Timedelta(hours=self.active_hours)]
+        self.series = active[series_cols].astype(str).reset_index(drop=True)
+        self._row_station = self.stations.get_indexer(self.series[KEY])
+        latest = recent.drop_duplicates(KEY, keep='last')  # Latest station attributes
+        defaults = self.pre.encode(latest)[pd.Index(latest[KEY].astype(str)).get_indexer(self.stations)]
+        self._base = self.pre.encode(self.series, defaults[self._row_station])
+        row_of = pd.MultiIndex.from_frame(self.series).get_indexer(
+            pd.MultiIndex.from_frame(recent[series_cols].astype(str)))
+        self._values = np.full((len(self.series), n_cols), np.nan)
+        self._values[row_of[row_of >= 0], col[row_of >= 0]] = value[row_of >= 0]
+
+        digest = hashlib.sha256(pd.util.hash_pandas_object(
+            recent[[c for c in (*series_cols, TIME, 'ridership') if c in recent.columns]], index=False
+        ).to_numpy().tobytes())
+        self.version = f"{model_hash(self.booster)}-{digest.hexdigest()[:16]}"
+        self._cache.clear()
+
+    def _features(self, c: int) -> dict:
+        """Lag and rolling features (float32, filled) of every series row for hour column c."""
+        out = {}
+        for h in LAGS:
+            lag = self._values[:, c - h] if c - h >= 0 else np.full(len(self.series), np.nan)
+            out[lag_column(h)] = lag
+        p = self._prefix
+        for label, w in _WINDOW_HOURS.items():
+            lo = max(c - w, 0)
+            cnt = p['cnt'][:, c] - p['cnt'][:, lo]
+            total = p['sum'][:, c] - p['sum'][:, lo]
+            with np.errstate(invalid='ignore', divide='ignore'):
+                mean = total / cnt
+                var = (p['sq'][:, c] - p['sq'][:, lo] - cnt * mean ** 2) / (cnt - 1)
+            std = np.where(cnt > 1, np.sqrt(np.clip(var, 0, None)), np.nan)
+            lo_v, hi_v = self._min[:, lo:c].min(axis=1), self._max[:, lo:c].max(axis=1)
+            stats = {'mean': mean, 'std': std, 'min': np.where(cnt > 0, lo_v, np.nan),
+                     'max': np.where(cnt > 0, hi_v, np.nan)}
+            for stat in ROLL_STATS:
+                out[roll_column(stat, label)] = stats[stat][self._row_station]
+        for col, arr in out.items():
+            fill = 0.0 if '_roll_std_' in col else self.fill_value
+            out[col] = np.where(np.isnan(arr), fill, arr).astype('float32')
+        return out
+
+    def _record(self, c: int, pred: np.ndarray) -> None:
+        """Write predicted ridership for hour column c into the series values and station aggregates."""
+        self._values[:, c] = pred
+        n_s = len(self.stations)
+        for name, weights in (('sum', pred), ('sq', pred.astype('float64') ** 2), ('cnt', None)):
+            added = np.bincount(self._row_station, weights, minlength=n_s)
+            self._prefix[name][:, c + 1] = self._prefix[name][:, c] + added
+        np.minimum.at(self._min[:, c], self._row_station, pred)
+        np.maximum.at(self._max[:, c], self._row_station, pred)
+
+    def _run(self, hours: int) -> np.ndarray:
+        """Recursive forecast; returns (series rows x hours) predicted ridership."""
+        cols = self.pre.columns
+        for name, p in self._prefix.items():  # Forget a previous run's predictions
+            p[:, self.n_hist + 1:] = p[:, [self.n_hist]]
+        self._min[:, self.n_hist:] = np.inf
+        self._max[:, self.n_hist:] = -np.inf
+        self._values[:, self.n_hist:] = np.nan
+        for k in range(hours):
+            c = self.n_hist + k
+            ts = self.start + pd.Timedelta(hours=c)
+            X = self._base.copy()
+            calendar = {'hour': ts.hour, 'day_of_week': ts.dayofweek, 'month': ts.month,
+                        'is_weekend': int(ts.dayofweek >= 5)}
+            for col, values in {**calendar, **self._features(c)}.items():
+                if col in cols:
+                    X[:, cols[col]] = values
+            pred = self.booster.inplace_predict(self.pre.scale(X), iteration_range=self.iteration_range)
+            self._record(c, np.clip(pred, 0, None))  # Ridership is never negative
+        return self._values[:, self.n_hist:self.n_hist + hours].copy()
+
+    def forecast(self, hours: int = 24, by_series: bool = False) -> pd.DataFrame:
+        """
+        Forecast every station `hours` hours past the end of history (cached).
+
+        Args:
+        - hours (int): Horizon, 1 to MAX_HOURS.
+        - by_series (bool): One row per (station, series, hour) instead of station totals.
+
+        Returns:
+        - DataFrame: station_complex_id (and SERIES columns), transit_timestamp, ridership (predicted).
+        """
+        if not 1 <= hours <= MAX_HOURS:
+            raise ValueError(f"hours must be between 1 and {MAX_HOURS}")
+        key = (hours, by_series)
+        if key not in self._cache:
+            store_key = self.store.key('all' if not by_series else 'all_series', self.end, self.end, hours,
+                                       self.version, ENGINE) if self.store is not None else None
+            table = self.store.get(store_key) if store_key else None
+            if table is None:
+                table = self._table(self._run(hours), by_series)
+                if store_key:
+                    self.store.put(store_key, table, meta={'hours': hours, 'engine': ENGINE})
+            self._cache[key] = table
+        return self._cache[key]
+
+    def _table(self, pred: np.ndarray, by_series: bool) -> pd.DataFrame:
+        hours = pred.shape[1]
+        stamps = pd.date_range(self.end + pd.Timedelta(hours=1), periods=hours, freq='h')
+        if by_series:
+            frame = self.series.loc[self.series.index.repeat(hours)].reset_index(drop=True)
+            return frame.assign(**{TIME: np.tile(stamps, len(self.series)), 'ridership': pred.ravel()})
+        totals = np.zeros((len(self.stations), hours))
+        np.add.at(totals, self._row_station, pred)
+        return pd.DataFrame({KEY: np.repeat(np.asarray(self.stations), hours),
+                             TIME: np.tile(stamps, len(self.stations)), 'ridership': totals.ravel()})
+
+    def actuals(self, station_id, hours: int = 48) -> pd.DataFrame:
+        """A station's observed hourly totals over the last `hours` hours of history."""
+        i = self.stations.get_indexer([str(station_id)])[0]
+        lo = max(self.n_hist - hours, 0)
+        sums = np.diff(self._prefix['sum'][i, lo:self.n_hist + 1]) if i >= 0 else np.zeros(self.n_hist - lo)
+        return pd.DataFrame({TIME: pd.date_range(self.start + pd.Timedelta(hours=lo), periods=len(sums), freq='h'),
+                             'ridership': sums})
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Recursive hourly XGBoost forecasts for every station.")
+    parser.add_argument('--model', default=MODEL_PATH, help="Model saved by train.py")
+    parser.add_argument('--master', default=MASTER_PARQUET_DIR, help="Master Parquet dataset")
+    parser.add_argument('--hours', type=int, default=MAX_HOURS, help=f"Hours ahead (1-{MAX_HOURS})")
+    parser.add_argument('--by-series', action='store_true', help="Per payment method / fare class rows")
+    parser.add_argument('--output', default='hourly_forecast.parquet', help="Parquet file to write")
+    args = parser.parse_args()
+
+    t0 = time.time()
+    forecaster = HourlyForecaster(args.model, args.master)
+    t1 = time.time()
+    table = forecaster.forecast(args.hours, args.by_series)
+    table.to_parquet(args.output, index=False)
+    print(f"Loaded {len(forecaster.series)} series in {t1 - t0:.1f}s; forecast {args.hours}h for "
+          f"{len(forecaster.stations)} stations in {time.time() - t1:.1f}s -> {args.output}")
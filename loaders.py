@@ -0,0 +1,95 @@
+# ---------------------------------------------------
+# Size-aware CSV loader for the notebooks
+# Drop-in replacement for load_csvs_and_sample: oversized files are sampled
+# chunk by chunk while parsing (never fully materialized) and the small files
+# are read in parallel threads. Files in the schema.py dataset registry are
+# read with its dtypes and fixed timestamp formats; other files are inferred.
+# Dependencies (install with pip if needed):
+#   pandas, numpy, pyarrow
+# ---------------------------------------------------
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from schema import dataset_dtypes, dataset_for, parse_dataset_timestamps, read_dataset
+
+CHUNKSIZE = 1_000_000  # Rows parsed per chunk for oversized files
+
+
+def read_csv_sampled(csv_path: str, sample_fraction: float, seed: int = 42,
+                     chunksize: int = CHUNKSIZE, dataset: str = None, **read_kwargs) -> pd.DataFrame:
+    """
+    Bernoulli-sample a CSV while parsing it in chunks.
+
+    Peak memory is one chunk plus the sample. Each chunk draws from its own
+    RNG stream spawned from `seed`, so chunks are sampled independently and
+    the result is reproducible. With a registered `dataset`, chunks are read
+    with its dtypes (categoricals are built once on the sample, so chunks with
+    different categories still concatenate) and its timestamps are parsed.
+    """
+    dtype = dataset_dtypes(dataset, csv_path) if dataset else {}
+    categories = [c for c, t in dtype.items() if t == 'category']
+    read_kwargs.setdefault('dtype', {c: 'str' if t == 'category' else t for c, t in dtype.items()} or None)
+    root = np.random.SeedSequence(seed)
+    parts = []
+    for chunk in pd.read_csv(csv_path, chunksize=chunksize, **read_kwargs):
+        rng = np.random.default_rng(root.spawn(1)[0])
+        parts.append(chunk[rng.random(len(chunk)) < sample_fraction])
+    sample = pd.concat(parts, ignore_index=True) if parts else pd.read_csv(csv_path, nrows=0, **read_kwargs)
+    if dataset:
+        sample = sample.astype({c: 'category' for c in categories})
+        parse_dataset_timestamps(dataset, sample)
+    return sample
+
+
+def _read_full(csv_path: str) -> pd.DataFrame:
+    """Whole file, typed from the registry when it is a known dataset."""
+    dataset = dataset_for(csv_path)
+    return read_dataset(dataset, csv_path) if dataset else pd.read_csv(csv_path)
+
+
+def load_csvs_and_sample(csv_list, size_limit_gb=1.5, sample_fraction=0.05, seed=42, workers=None):
+    """
+    Load CSV files into dataframes and sample large files to bring their size below the specified limit.
+
+    Args:
+    - csv_list (list): List of CSV file paths to load.
+    - size_limit_gb (float): Size limit in GB for each CSV file.
+    - sample_fraction (float): Fraction to sample for files exceeding the size limit.
+    - seed (int): Root seed for the chunk samplers.
+    - workers (int): Threads for the files within the limit (default: one per file, capped at 8).
+
+    Files are matched to the schema.py registry by name (schema.dataset_for); those get
+    its dtypes and timestamp formats, the rest are read with inferred types.
+
+    Returns:
+    - dict: Dictionary containing dataframe names (keys) and dataframes (values).
+    """
+    size_limit_bytes = size_limit_gb * (1024 ** 3)  # Convert GB to bytes
+    small, large = [], []
+
+    for csv_path in csv_list:
+        if not os.path.exists(csv_path):
+            print(f"File {csv_path} does not exist.")
+            continue
+        file_size_bytes = os.path.getsize(csv_path)
+        print(f"Processing {os.path.basename(csv_path)}: Size = {file_size_bytes / (1024 ** 3):.2f} GB")
+        (large if file_size_bytes > size_limit_bytes else small).append(csv_path)
+
+    loaded = {}
+    # Small files: parallel full reads (the parser releases the GIL while tokenizing)
+    if small:
+        for csv_path in small:
+            print(f"{os.path.basename(csv_path)} is within size limit. Loading...")
+        with ThreadPoolExecutor(max_workers=workers or min(8, len(small))) as pool:
+            loaded.update(zip(small, pool.map(_read_full, small)))
+
+    # Large files: one at a time so only one chunk of raw rows is in memory
+    for csv_path in large:
+        print(f"{os.path.basename(csv_path)} exceeds size limit. Streaming and sampling...")
+        loaded[csv_path] = read_csv_sampled(csv_path, sample_fraction, seed=seed, dataset=dataset_for(csv_path))
+
+    # Keep the input order; key by the CSV name without extension
+    return {os.path.splitext(os.path.basename(p))[0]: loaded[p] for p in csv_list if p in loaded}
@@ -0,0 +1,289 @@
+# ---------------------------------------------------
+# Master table build (pandas) with an incremental mode
+# The notebook's cleaning -> merge -> feature cells as functions, plus a
+# daily update that only processes hourly rows past the stored high-water
+# mark and rewrites just the affected date partitions and rollup rows.
+# Usage:
+#   python master_build.py --output master_df.parquet            # incremental (full on first run)
+#   python master_build.py --output master_df.parquet --full     # rebuild everything
+# Dependencies (install with pip if needed):
+#   pandas, numpy, pyarrow
+# ---------------------------------------------------
+import argparse
+import json
+import os
+import shutil
+import time
+
+import pandas as pd
+
+from alert_join import flag_alerts
+from features import LAGS, ROLL_WINDOWS, SERIES, add_rolling_features, lag_features
+from geodistance import TIMES_SQUARE, distance_to_point
+from master_store import MASTER_PARQUET_DIR, export_master_parquet, has_master_parquet, load_master
+from rollups import ROLLUP_DIR, build_rollups, cubes_from_hourly, has_rollups, load_rollups, save_rollups
+from schema import DATASETS, MTA_TS_FORMAT, apply_master_schema, parse_timestamps, read_dataset
+
+KEY = 'station_complex_id'
+STATE_FILE = '_build_state.json'  # Inside the dataset root; '_' files are ignored by pyarrow
+# History re-read for lag/rolling features
+LOOKBACK = max([pd.Timedelta(w) for w in ROLL_WINDOWS.values()] + [pd.Timedelta(hours=max(LAGS))])
+HISTORY_COLUMNS = [KEY, *SERIES, 'transit_timestamp', 'ridership']
+
+RAW_PATHS = {
+    'hourly': "/kaggle/input/mta-combined/MTA_Subway_Hourly_Ridership__Beginning_July_2020.csv",
+    'od': "/kaggle/input/mta-combined/MTA_Subway_Origin-Destination_Ridership_Estimate__2024.csv",
+    'alerts': "/kaggle/input/mta-combined/MTA_Service_Alerts__Beginning_April_2020.csv",
+    'stations': "/kaggle/input/mta-combined/MTA_Subway_Stations_and_Complexes.csv",
+}
+
+BOROUGH_MAP = {'Q': 'Queens', 'M': 'Manhattan', 'Bk': 'Brooklyn', 'Bx': 'Bronx', 'Si': 'Staten Island'}
+# Fixed categories so every incremental batch writes the same Borough dictionary
+BOROUGHS = ['Bronx', 'Brooklyn', 'Manhattan', 'Queens', 'Staten Island']
+
+
+# ------------------------------------------------------------------
+# Cleaning (mirrors the notebook cleaning cells)
+# ------------------------------------------------------------------
+def clean_hourly(df: pd.DataFrame) -> pd.DataFrame:
+    """Drop invalid timestamps and duplicate rows; station IDs as strings."""
+    df = df.copy()
+    df['transit_timestamp'] = parse_timestamps(df['transit_timestamp'], MTA_TS_FORMAT)
+    df = df.dropna(subset=['transit_timestamp']).drop_duplicates()
+    df[KEY] = df[KEY].astype(str)
+    return df
+
+
+def clean_od(df: pd.DataFrame) -> pd.DataFrame:
+    """Median-fill ridership, parse timestamps, dedupe; station IDs as strings."""
+    df = df.copy()
+    col = 'Estimated Average Ridership'
+    df[col] = df[col].fillna(df[col].median())
+    df['Timestamp'] = parse_timestamps(df['Timestamp'], MTA_TS_FORMAT)
+    df = df.dropna(subset=['Timestamp']).drop_duplicates()
+    for c in ('Origin Station Complex ID', 'Destination Station Complex ID'):
+        df[c] = df[c].astype(str)
+    return df
+
+
+def clean_alerts(df: pd.DataFrame) -> pd.DataFrame:
+    """Drop alerts without a description or date, normalize labels, dedupe Alert IDs."""
+    df = df.dropna(subset=['Description']).copy()
+    df['Date'] = parse_timestamps(df['Date'], MTA_TS_FORMAT)
+    df = df.dropna(subset=['Date'])
+    df['Status Label'] = df['Status Label'].str.strip().str.lower()
+    df['Affected'] = df['Affected'].fillna('Unknown')
+    return df.drop_duplicates(subset=['Alert ID'])
+
+
+def clean_stations(df: pd.DataFrame) -> pd.DataFrame:
+    """Borough names, numeric coordinates, one row per GTFS stop; Complex ID -> station_complex_id."""
+    df = df.copy()
+    df['Borough'] = df['Borough'].replace(BOROUGH_MAP).str.title()
+    df['ADA Notes'] = df['ADA Notes'].fillna('No Notes')
+    df['Latitude'] = pd.to_numeric(df['Latitude'], errors='coerce')
+    df['Longitude'] = pd.to_numeric(df['Longitude'], errors='coerce')
+    df = df.dropna(subset=['Latitude', 'Longitude']).drop_duplicates(subset=['GTFS Stop IDs'])
+    df['ADA'] = (df['ADA'] == 1).map({True: 'Yes', False: 'No'})
+    df = df.rename(columns={'Complex ID': KEY})
+    df[KEY] = df[KEY].astype(str)
+    return df
+
+
+# ------------------------------------------------------------------
+# Merges and features
+# ------------------------------------------------------------------
+def merge_sources(hourly: pd.DataFrame, od: pd.DataFrame, alerts: pd.DataFrame,
+                  stations: pd.DataFrame) -> pd.DataFrame:
+    """Station metadata, is_alert and OD_ridership joined onto the hourly rows."""
+    df = hourly.merge(stations, how='left', on=KEY, suffixes=('', '_station'))
+    df['alert_date'] = df['transit_timestamp'].dt.date
+    df['is_alert'] = flag_alerts(df, alerts)
+
+    od_agg = (od.assign(Date=od['Timestamp'].dt.date, Hour=od['Timestamp'].dt.hour)
+                .groupby(['Date', 'Hour', 'Destination Station Complex Name'], observed=True)
+                ['Estimated Average Ridership'].sum().reset_index()
+                .rename(columns={'Destination Station Complex Name': 'Stop Name',
+                                 'Estimated Average Ridership': 'OD_ridership'}))
+    od_agg['Stop Name'] = od_agg['Stop Name'].astype(str)
+    df = df.merge(od_agg, how='left', left_on=['alert_date', df['transit_timestamp'].dt.hour, 'Stop Name'],
+                  right_on=['Date', 'Hour', 'Stop Name'], suffixes=('', '_OD'))
+    df['OD_ridership'] = df['OD_ridership'].fillna(0)
+    return df.drop(columns=['Date', 'Hour', 'key_1'], errors='ignore')
+
+
+def add_time_features(df: pd.DataFrame) -> pd.DataFrame:
+    """hour, day_of_week (Monday=0), month and is_weekend."""
+    ts = df['transit_timestamp'].dt
+    df['hour'] = ts.hour
+    df['day_of_week'] = ts.dayofweek
+    df['month'] = ts.month
+    df['is_weekend'] = (df['day_of_week'] >= 5).astype(int)
+    return df
+
+
+def add_lag_features(df: pd.DataFrame, context: pd.DataFrame = None, fill_value: float = None) -> pd.DataFrame:
+    """
+    Calendar lags (1h, 2h, 24h, 168h) and trailing time-window rolling stats of ridership.
+
+    Args:
+    - df (DataFrame): Rows that need features.
+    - context (DataFrame): Earlier rows (KEY, SERIES, transit_timestamp, ridership) used only
+      as history, so rows at the start of an incremental batch still see their predecessors.
+    - fill_value (float): Value for missing lags / rolling means (default: median ridership).
+
+    Returns:
+    - DataFrame: df sorted by station and time with the lag and rolling columns.
+    """
+    fill_value = df['ridership'].median() if fill_value is None else fill_value
+    df = df.assign(_new=True)
+    if context is not None and len(context):
+        cols = [c for c in HISTORY_COLUMNS if c in df.columns and c in context.columns]
+        df = pd.concat([context[cols].assign(_new=False), df], ignore_index=True)
+    df = df.sort_values([KEY, 'transit_timestamp'], kind='stable', ignore_index=True)
+    lags = lag_features(df, fill_value=fill_value)  # One sort shared by every lag
+    df[lags.columns] = lags
+    df = add_rolling_features(df, fill_value=fill_value)
+    return df[df['_new']].drop(columns='_new')
+
+
+def add_borough_category(df: pd.DataFrame) -> pd.DataFrame:
+    """'Borough' as a categorical over the fixed BOROUGHS list (encoded for models by encoding.py)."""
+    if 'Borough' in df.columns:
+        df['Borough'] = pd.Categorical(df['Borough'], categories=BOROUGHS)
+    return df
+
+
+def build_master(hourly: pd.DataFrame, od: pd.DataFrame, alerts: pd.DataFrame, stations: pd.DataFrame,
+                 context: pd.DataFrame = None, fill_value: float = None) -> pd.DataFrame:
+    """Cleaned sources -> master table with the notebook's features and compact dtypes."""
+    df = merge_sources(hourly, od, alerts, stations)
+    df = add_time_features(df)
+    df = add_lag_features(df, context, fill_value)
+    df = add_borough_category(df)
+    df['distance_to_central'] = distance_to_point(df, TIMES_SQUARE)
+    return apply_master_schema(df)
+
+
+# ------------------------------------------------------------------
+# Incremental build
+# ------------------------------------------------------------------
+def read_state(root: str = MASTER_PARQUET_DIR) -> dict:
+    """Build state stored next to the partitions ({} before the first build)."""
+    path = os.path.join(root, STATE_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def write_state(root: str, state: dict) -> None:
+    """Write the state atomically so a crashed run keeps the previous mark."""
+    path = os.path.join(root, STATE_FILE)
+    with open(path + '.tmp', 'w') as f:
+        json.dump(state, f, indent=2)
+    os.replace(path + '.tmp', path)
+
+
+def read_hourly_since(path: str, since=None, chunksize: int = 1_000_000) -> pd.DataFrame:
+    """Stream the raw hourly CSV and keep only rows at or after `since` (all rows if None)."""
+    dtype = DATASETS['hourly']['dtypes']
+    parts = []
+    for chunk in pd.read_csv(path, dtype=dtype, chunksize=chunksize):
+        chunk['transit_timestamp'] = parse_timestamps(chunk['transit_timestamp'], MTA_TS_FORMAT)
+        if since is not None:
+            chunk = chunk[chunk['transit_timestamp'] >= since]
+        parts.append(chunk)
+    return pd.concat(parts, ignore_index=True) if parts else pd.DataFrame(columns=list(dtype))
+
+
+def update_rollups(new_rows: pd.DataFrame, cutoff, rollup_dir: str = ROLLUP_DIR) -> None:
+    """Replace the rollup rows from `cutoff` on with the ones built from new_rows."""
+    fresh = build_rollups(new_rows)
+    if cutoff is None or not has_rollups(rollup_dir):
+        save_rollups(fresh, rollup_dir)
+        return
+    hourly = load_rollups(rollup_dir)['hourly']
+    hourly = pd.concat([hourly[hourly['date'] < cutoff], fresh['hourly']], ignore_index=True)
+    save_rollups(cubes_from_hourly(hourly.sort_values([KEY, 'date', 'hour'], ignore_index=True)), rollup_dir)
+
+
+def build_incremental(paths: dict = RAW_PATHS, root: str = MASTER_PARQUET_DIR, rollup_dir: str = ROLLUP_DIR,
+                      lookback: pd.Timedelta = LOOKBACK, full: bool = False,
+                      fill_value: float = None) -> pd.DataFrame:
+    """
+    Bring the master dataset up to date with the raw files.
+
+    Rows from the start of the high-water mark's day onward are rebuilt, so every
+    touched date partition is rewritten whole; `lookback` days of existing master
+    rows feed the lag/rolling features of the first new hours. The first run (or
+    full=True) clears `root` and builds everything.
+
+    Missing lags / windows are filled with the median ridership of the first
+    build, kept in the state file so partitions written by different runs use
+    the same fill. A later full build recomputes the median over all rows, so
+    its features match the incremental ones only when given that stored
+    fill_value.
+
+    Args:
+    - fill_value (float): Fill for missing lag / rolling values (default: the
+      stored value, or the median ridership of a first / full build).
+
+    Returns:
+    - DataFrame: The master rows that were written.
+    """
+    t0 = time.time()
+    state = {} if full or not has_master_parquet(root) else read_state(root)
+    hwm = pd.Timestamp(state['high_water_mark']) if state.get('high_water_mark') else None
+    cutoff = hwm.normalize() if hwm is not None else None
+
+    hourly = clean_hourly(read_hourly_since(paths['hourly'], cutoff))
+    if hourly.empty:
+        print("No new hourly rows.")
+        return hourly
+    if hwm is not None and hourly['transit_timestamp'].max() <= hwm:
+        print(f"No hourly rows after {hwm}.")
+        return hourly.iloc[:0]
+
+    lo = hourly['transit_timestamp'].min().normalize()
+    od = clean_od(read_dataset('od', paths['od']))
+    od = od[od['Timestamp'] >= lo]
+    alerts = clean_alerts(read_dataset('alerts', paths['alerts']))
+    alerts = alerts[alerts['Date'] >= lo]
+    stations = clean_stations(read_dataset('stations', paths['stations']))
+
+    context = None
+    if cutoff is not None:
+        context = load_master(root, columns=HISTORY_COLUMNS,
+                              date_range=(cutoff - lookback, cutoff - pd.Timedelta(days=1)))
+    if fill_value is None:
+        fill_value = state.get('ridership_median', hourly['ridership'].median())
+    master = build_master(hourly, od, alerts, stations, context, fill_value)
+
+    if cutoff is None and os.path.isdir(root):
+        shutil.rmtree(root)  # Full build: no partition of an earlier build may survive
+    export_master_parquet(master, root, existing_data_behavior='delete_matching')
+    update_rollups(master, cutoff, rollup_dir)
+    write_state(root, {
+        'high_water_mark': str(master['transit_timestamp'].max()),
+        'ridership_median': float(fill_value),
+        'rows_written': int(len(master)),
+        'updated': time.strftime('%Y-%m-%dT%H:%M:%S'),
+    })
+    print(f"Wrote {len(master):,} rows from {master['transit_timestamp'].min()} in {time.time() - t0:.1f}s -> {root}")
+    return master
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Build or incrementally update the master table.")
+    for name, path in RAW_PATHS.items():
+        parser.add_argument(f'--{name}', default=path, help=f"Raw {name} CSV")
+    parser.add_argument('--output', default=MASTER_PARQUET_DIR, help="Partitioned master dataset")
+    parser.add_argument('--rollups', default=ROLLUP_DIR, help="Rollup directory")
+    parser.add_argument('--lookback-days', type=int, default=LOOKBACK.days, help="History kept for lag features")
+    parser.add_argument('--full', action='store_true', help="Delete the dataset and rebuild it from scratch")
+    parser.add_argument('--fill-value', type=float, default=None,
+                        help="Fill for missing lag/rolling values (default: stored, or the median ridership)")
+    args = parser.parse_args()
+    build_incremental({name: getattr(args, name) for name in RAW_PATHS}, args.output, args.rollups,
+                      pd.Timedelta(days=args.lookback_days), args.full, args.fill_value)
@@ -0,0 +1,130 @@
+# ---------------------------------------------------
+# Columnar store for the master table
+# Writes df_master as a Parquet dataset partitioned by date and borough and
+# reads back only the columns / partitions a caller needs.
+# Dependencies (install with pip if needed):
+#   pandas, pyarrow
+# ---------------------------------------------------
+import os
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+
+MASTER_PARQUET_DIR = "master_df.parquet"  # Default location next to master_df.csv
+
+# Hive-style partition keys: master_df.parquet/date=2024-04-02/borough=Bronx/part-0.parquet
+PARTITION_SCHEMA = pa.schema([('date', pa.date32()), ('borough', pa.string())])
+PARTITIONING = ds.partitioning(PARTITION_SCHEMA, flavor='hive')
+
+# Columns the Streamlit dashboard actually reads
+DASHBOARD_COLUMNS = [
+    'transit_timestamp', 'station_complex_id', 'station_complex', 'borough',
+    'payment_method', 'fare_class_category', 'ridership',
+    'latitude', 'longitude', 'distance_to_central',
+]
+
+
+def export_master_parquet(df: pd.DataFrame, root: str = MASTER_PARQUET_DIR,
+                          existing_data_behavior: str = 'delete_matching') -> None:
+    """
+    Write the master table as a Parquet dataset partitioned by date and borough.
+
+    Args:
+    - df (DataFrame): Master table with a 'transit_timestamp' and 'borough' column.
+    - root (str): Output directory of the dataset.
+    - existing_data_behavior (str): Passed to pyarrow; the default replaces only
+      the partitions present in df and leaves the others untouched.
+    """
+    out = df.copy()
+    out['transit_timestamp'] = pd.to_datetime(out['transit_timestamp'])
+    out['date'] = out['transit_timestamp'].dt.date  # Partition key (overwrites the object 'date' column)
+    # Sort so every row group covers a single station and a contiguous time span
+    sort_cols = [c for c in ('station_complex_id', 'transit_timestamp') if c in out.columns]
+    out = out.sort_values(sort_cols, kind='stable')
+
+    table = pa.Table.from_pandas(out, preserve_index=False)
+    ds.write_dataset(
+        table, root, format='parquet', partitioning=PARTITIONING,
+        existing_data_behavior=existing_data_behavior,
+        max_rows_per_group=256 * 1024,
+    )
+
+
+def open_master(root: str = MASTER_PARQUET_DIR) -> ds.Dataset:
+    """Open the partitioned master dataset without reading any data."""
+    return ds.dataset(root, format='parquet', partitioning=PARTITIONING)
+
+
+def master_date_bounds(root: str = MASTER_PARQUET_DIR):
+    """
+    Return the (min, max) date stored in the dataset.
+
+    Uses only the partition directory names, so no data files are opened.
+    """
+    dates = [
+        ds.get_partition_keys(frag.partition_expression)['date']
+        for frag in open_master(root).get_fragments()
+    ]
+    return min(dates), max(dates)
+
+
+def _build_filter(date_range=None, station=None, boroughs=None):
+    """Combine the optional predicates into a single pyarrow expression."""
+    expr = None
+    terms = []
+    if date_range is not None:
+        start, end = date_range
+        terms.append(ds.field('date') >= pd.Timestamp(start).date())
+        terms.append(ds.field('date') <= pd.Timestamp(end).date())
+    if station is not None:
+        terms.append(ds.field('station_complex') == station)
+    if boroughs is not None:
+        terms.append(ds.field('borough').isin(list(boroughs)))
+    for t in terms:
+        expr = t if expr is None else expr & t
+    return expr
+
+
+def load_master(root: str = MASTER_PARQUET_DIR, columns=None, date_range=None,
+                station=None, boroughs=None) -> pd.DataFrame:
+    """
+    Load the master table with column pruning and predicate pushdown.
+
+    Partition filters (date, borough) skip whole directories; the station filter
+    is checked against row-group statistics so unrelated row groups are never decoded.
+
+    Args:
+    - root (str): Dataset directory written by export_master_parquet.
+    - columns (list): Columns to read (None reads all of them).
+    - date_range (tuple): Inclusive (start, end) dates.
+    - station (str): Only rows of this station_complex.
+    - boroughs (list): Only rows of these boroughs.
+
+    Returns:
+    - DataFrame: The matching rows sorted by transit_timestamp.
+    """
+    dataset = open_master(root)
+    if columns is not None:
+        columns = [c for c in columns if c in dataset.schema.names]
+    table = dataset.to_table(columns=columns,
+                             filter=_build_filter(date_range, station, boroughs))
+    df = table.to_pandas()
+    if 'transit_timestamp' in df.columns:
+        df = df.sort_values('transit_timestamp', kind='stable').reset_index(drop=True)
+    return df
+
+
+def has_master_parquet(root: str = MASTER_PARQUET_DIR) -> bool:
+    """True when a Parquet export of the master table exists at root."""
+    return os.path.isdir(root) and any(True for _ in os.scandir(root))
+
+
+if __name__ == '__main__':
+    # Convert an existing CSV export: python master_store.py master_df.csv master_df.parquet
+    import sys
+    src = sys.argv[1] if len(sys.argv) > 1 else 'master_df.csv'
+    dst = sys.argv[2] if len(sys.argv) > 2 else MASTER_PARQUET_DIR
+    export_master_parquet(pd.read_csv(src, parse_dates=['transit_timestamp']), dst)
+    lo, hi = master_date_bounds(dst)
+    print(f"Wrote {dst} (dates {lo} .. {hi})")
@@ -0,0 +1,135 @@
+# ---------------------------------------------------
+# Fitted preprocessing artifact for the ridership model
+# One JSON file with everything between raw rows and the model: feature
+# order, dropped (correlated) columns, category vocabularies and scaler
+# statistics. transform() writes rows straight into a float32 matrix
+# (categoricals as vocabulary codes), for DataFrames, lists of dicts or a
+# single dict, without building per-request DataFrames.
+# Dependencies (install with pip if needed):
+#   pandas, numpy
+# ---------------------------------------------------
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from encoding import CategoryEncoder
+
+PREPROCESSOR_SUFFIX = '.preprocess.json'
+
+
+def preprocessor_path(model_path: str) -> str:
+    """Artifact saved alongside a model, e.g. xgb_model.json -> xgb_model.preprocess.json."""
+    return os.path.splitext(model_path)[0] + PREPROCESSOR_SUFFIX
+
+
+class Preprocessor:
+    """
+    Feature order, category codes, drop list and standardization in one object.
+
+    encode() gives the unscaled matrix (so callers can patch in more values,
+    e.g. history features), scale() applies the stored scaler in place and
+    transform() does both.
+    """
+
+    def __init__(self, feature_names: list, vocab: dict = None, drop: list = None,
+                 scale_columns: list = None, mean: list = None, scale: list = None):
+        self.feature_names = list(feature_names)
+        self.vocab = {c: list(v) for c, v in (vocab or {}).items() if c in self.feature_names}
+        self.drop = list(drop or [])
+        self.scale_columns = [c for c in (scale_columns or []) if c in self.feature_names]
+        self.mean = np.asarray(mean if mean is not None else [], dtype='float32')
+        self.scale_ = np.asarray(scale if scale is not None else [], dtype='float32')
+        self.columns = {name: j for j, name in enumerate(self.feature_names)}
+        self.codes = {c: {cat: i for i, cat in enumerate(cats)} for c, cats in self.vocab.items()}
+        self._scale_idx = np.array([self.columns[c] for c in self.scale_columns], dtype='int64')
+
+    @classmethod
+    def fit(cls, X: pd.DataFrame, encoder: CategoryEncoder = None, drop: list = None,
+            scale_columns: list = None) -> 'Preprocessor':
+        """
+        Fit on training features.
+
+        Args:
+        - X (DataFrame): Training feature frame (target removed); drop-listed columns are excluded.
+        - encoder (CategoryEncoder): Fitted vocabularies (default: fitted on X's string columns).
+        - drop (list): Columns removed by feature selection.
+        - scale_columns (list): Columns to standardize (default: none; trees don't need it).
+        """
+        X = X.drop(columns=[c for c in (drop or []) if c in X.columns])
+        encoder = encoder or CategoryEncoder().fit(X)
+        scale_columns = [c for c in (scale_columns or []) if c in X.columns]
+        values = X[scale_columns].to_numpy(dtype='float64', na_value=np.nan)
+        mean = np.nanmean(values, axis=0) if scale_columns else []
+        std = np.nanstd(values, axis=0) if scale_columns else np.array([])
+        return cls(list(X.columns), encoder.vocab, drop, scale_columns, mean, np.where(std > 0, std, 1.0))
+
+    @classmethod
+    def from_fitted(cls, feature_names, encoder: CategoryEncoder = None, drop: list = None,
+                    scaler=None, scale_columns: list = None) -> 'Preprocessor':
+        """Wrap objects fitted elsewhere (e.g. the notebook's StandardScaler and CategoryEncoder)."""
+        mean = scale = None
+        if scaler is not None:
+            scale_columns = list(scale_columns if scale_columns is not None else scaler.feature_names_in_)
+            mean, scale = scaler.mean_, scaler.scale_
+        return cls(list(feature_names), encoder.vocab if encoder is not None else None, drop,
+                   scale_columns if scaler is not None else None, mean, scale)
+
+    def encode(self, data, base: np.ndarray = None) -> np.ndarray:
+        """
+        Unscaled float32 matrix in feature order (missing fields and unseen categories -> NaN).
+
+        Args:
+        - data (DataFrame | list of dicts | dict): Rows to encode.
+        - base (ndarray): Starting values per row (e.g. station defaults); fields in data overwrite them.
+        """
+        if isinstance(data, dict):
+            data = [data]
+        n = len(data)
+        X = np.full((n, len(self.feature_names)), np.nan, dtype='float32') if base is None \
+            else np.array(base, dtype='float32', copy=True)
+        if isinstance(data, pd.DataFrame):
+            for col in data.columns:
+                j = self.columns.get(col)
+                if j is None:
+                    continue
+                if col in self.codes:
+                    codes = pd.Categorical(data[col].astype('string'), categories=self.vocab[col]).codes
+                    X[:, j] = np.where(codes >= 0, codes, np.nan)
+                else:
+                    X[:, j] = pd.to_numeric(data[col], errors='coerce').to_numpy(dtype='float32', na_value=np.nan)
+            return X
+        for i, row in enumerate(data):
+            for col, value in row.items():
+                j = self.columns.get(col)
+                if j is None:
+                    continue
+                if col in self.codes:
+                    X[i, j] = self.codes[col].get(str(value), np.nan)
+                else:
+                    X[i, j] = np.nan if value is None else float(value)
+        return X
+
+    def scale(self, X: np.ndarray) -> np.ndarray:
+        """Standardize the scaled columns of an encoded matrix in place and return it."""
+        if len(self._scale_idx):
+            X[:, self._scale_idx] = (X[:, self._scale_idx] - self.mean) / self.scale_
+        return X
+
+    def transform(self, data, base: np.ndarray = None) -> np.ndarray:
+        """encode() then scale(): the model's input matrix."""
+        return self.scale(self.encode(data, base))
+
+    def save(self, path: str) -> None:
+        """Write the artifact as JSON."""
+        with open(path, 'w') as f:
+            json.dump({'feature_names': self.feature_names, 'vocab': self.vocab, 'drop': self.drop,
+                       'scale_columns': self.scale_columns, 'mean': self.mean.tolist(),
+                       'scale': self.scale_.tolist()}, f, indent=1)
+
+    @classmethod
+    def load(cls, path: str) -> 'Preprocessor':
+        """Restore an artifact written by save()."""
+        with open(path) as f:
+            return cls(**json.load(f))
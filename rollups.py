@@ -0,0 +1,141 @@
+# ---------------------------------------------------
+# Pre-aggregated ridership rollups for the dashboard
+# Materializes station x date x hour, station x day and station x ISO-week
+# cubes once so chart queries read a few hundred rows per station.
+# Dependencies (install with pip if needed):
+#   pandas, pyarrow
+# ---------------------------------------------------
+import os
+
+import pandas as pd
+
+ROLLUP_DIR = "rollups"  # Default output directory (one Parquet file per cube)
+CUBES = ('hourly', 'daily', 'weekly')
+KEY = 'station_complex_id'
+
+
+def build_rollups(df: pd.DataFrame) -> dict:
+    """
+    Aggregate hourly ridership rows into the three dashboard cubes.
+
+    Args:
+    - df (DataFrame): Rows with 'station_complex_id', 'transit_timestamp' and 'ridership'.
+
+    Returns:
+    - dict: {'hourly': station x date x hour, 'daily': station x date,
+             'weekly': station x ISO week (Monday start)}.
+    """
+    ts = pd.to_datetime(df['transit_timestamp'])
+    base = pd.DataFrame({
+        KEY: df[KEY].astype(str).values,
+        'date': ts.dt.normalize().values,
+        'hour': ts.dt.hour.astype('int8').values,
+        'ridership': df['ridership'].values,
+    })
+    hourly = base.groupby([KEY, 'date', 'hour'], sort=True)['ridership'].sum().reset_index()
+    return cubes_from_hourly(hourly)
+
+
+def cubes_from_hourly(hourly: pd.DataFrame) -> dict:
+    """Derive the daily and weekly cubes from a station x date x hour cube."""
+    daily = hourly.groupby([KEY, 'date'], sort=True)['ridership'].sum().reset_index()
+    week_start = daily['date'] - pd.to_timedelta(daily['date'].dt.weekday, unit='D')
+    weekly = (
+        daily.assign(week_start=week_start)
+             .groupby([KEY, 'week_start'], sort=True)['ridership'].sum().reset_index()
+    )
+    return {'hourly': hourly, 'daily': daily, 'weekly': weekly}
+
+
+def save_rollups(cubes: dict, root: str = ROLLUP_DIR) -> None:
+    """Write each cube to <root>/<name>.parquet."""
+    os.makedirs(root, exist_ok=True)
+    for name in CUBES:
+        cubes[name].to_parquet(os.path.join(root, f"{name}.parquet"), index=False)
+
+
+def load_rollups(root: str = ROLLUP_DIR) -> dict:
+    """Read the cubes written by save_rollups."""
+    return {name: pd.read_parquet(os.path.join(root, f"{name}.parquet")) for name in CUBES}
+
+
+def has_rollups(root: str = ROLLUP_DIR) -> bool:
+    """True when every cube file exists under root."""
+    return all(os.path.exists(os.path.join(root, f"{name}.parquet")) for name in CUBES)
+
+
+class RollupIndex:
+    """
+    Per-station lookup over the rollup cubes.
+
+    Each cube is split by station once, so a query is a dict lookup followed by
+    a date filter over that station's (small) slice.
+    """
+
+    def __init__(self, cubes: dict):
+        self._by_station = {
+            name: {sid: part.reset_index(drop=True) for sid, part in cubes[name].groupby(KEY, sort=False)}
+            for name in CUBES
+        }
+
+    def _slice(self, cube: str, station_id, col: str, start=None, end=None) -> pd.DataFrame:
+        part = self._by_station[cube].get(str(station_id))
+        if part is None:
+            return pd.DataFrame(columns=[KEY, col, 'ridership'])
+        mask = pd.Series(True, index=part.index)
+        if start is not None:
+            mask &= part[col] >= pd.Timestamp(start)
+        if end is not None:
+            mask &= part[col] <= pd.Timestamp(end)
+        return part.loc[mask]
+
+    def hourly_profile(self, station_id, start=None, end=None) -> pd.DataFrame:
+        """Total ridership per hour of day over the date range (columns: hour, ridership)."""
+        part = self._slice('hourly', station_id, 'date', start, end)
+        return part.groupby('hour')['ridership'].sum().reset_index()
+
+    def daily(self, station_id, start=None, end=None) -> pd.DataFrame:
+        """Daily totals, zero-filled between the first and last day like resample('D')."""
+        part = self._slice('daily', station_id, 'date', start, end)
+        s = part.set_index('date')['ridership']
+        if not s.empty:
+            s = s.reindex(pd.date_range(s.index.min(), s.index.max(), freq='D'), fill_value=0)
+        return s.rename_axis('transit_timestamp').reset_index(name='ridership')
+
+    def weekly(self, station_id, start=None, end=None) -> pd.DataFrame:
+        """
+        Weekly totals labelled by the closing Sunday like resample('W').
+
+        Weeks lying fully inside the range come from the weekly cube; the (at most two)
+        partial weeks at the edges are summed from the daily cube.
+        """
+        daily = self.daily(station_id, start, end)
+        if daily.empty:
+            return daily
+        days = daily['transit_timestamp']
+        week_end = days + pd.to_timedelta(6 - days.dt.weekday, unit='D')
+        lo, hi = days.min(), days.max()
+        edge = (week_end - pd.Timedelta(days=6) < lo) | (week_end > hi)
+        edges = daily.loc[edge].groupby(week_end[edge])['ridership'].sum()
+
+        full = self._slice('weekly', station_id, 'week_start', lo, hi - pd.Timedelta(days=6))
+        full = pd.Series(full['ridership'].values, index=full['week_start'] + pd.Timedelta(days=6))
+        out = pd.concat([full, edges]).sort_index()
+        out = out.reindex(pd.date_range(out.index.min(), out.index.max(), freq='W'), fill_value=0)
+        return out.rename_axis('transit_timestamp').reset_index(name='ridership')
+
+
+if __name__ == '__main__':
+    # Build the cubes from the master table: python rollups.py master_df.parquet rollups
+    import sys
+    from master_store import has_master_parquet, load_master
+    src = sys.argv[1] if len(sys.argv) > 1 else 'master_df.parquet'
+    dst = sys.argv[2] if len(sys.argv) > 2 else ROLLUP_DIR
+    cols = [KEY, 'transit_timestamp', 'ridership']
+    if has_master_parquet(src):
+        df = load_master(src, columns=cols)
+    else:
+        df = pd.read_csv(src, usecols=cols, parse_dates=['transit_timestamp'])
+    cubes = build_rollups(df)
+    save_rollups(cubes, dst)
+    print(", ".join(f"{name}: {len(cubes[name])} rows" for name in CUBES))
@@ -0,0 +1,173 @@
+# ---------------------------------------------------
+# Streaming samplers for the raw hourly and OD CSVs
+# Reads large CSVs block by block with pyarrow's multithreaded parser and
+# keeps a Bernoulli, reservoir or stratified sample without loading the file.
+# Every block gets its own RNG stream spawned from one seed, so the sample is
+# reproducible without reusing the same random draws for every chunk. Files in
+# the schema.py dataset registry are parsed with its column types and fixed
+# timestamp formats instead of per-block inference.
+# Dependencies (install with pip if needed):
+#   numpy, pyarrow
+# ---------------------------------------------------
+import os
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pv
+import pyarrow.parquet as pq
+
+from schema import MTA_TS_FORMAT, arrow_convert_options, dataset_for
+
+BLOCK_SIZE = 64 * 1024 * 1024  # Bytes of CSV parsed per block (split across threads)
+
+
+def station_month_strata(table: pa.Table, station_col: str = 'station_complex_id',
+                         ts_col: str = 'transit_timestamp', ts_format: str = MTA_TS_FORMAT) -> np.ndarray:
+    """Stratum key 'station|YYYY-MM' for each row of an hourly ridership block."""
+    ts = table.column(ts_col)
+    if not pa.types.is_timestamp(ts.type):
+        ts = pc.strptime(ts, format=ts_format, unit='s')
+    month = pc.strftime(ts, format='%Y-%m')
+    station = pc.cast(table.column(station_col), pa.string())
+    return pc.binary_join_element_wise(station, month, '|').to_numpy(zero_copy_only=False)
+
+
+def _open_blocks(input_path: str, column_types: dict = None, block_size: int = BLOCK_SIZE, dataset: str = None):
+    """
+    Stream RecordBatches from a CSV; blocks are parsed in parallel by pyarrow.
+
+    A registered dataset sets the column types and timestamp formats; column_types overrides them.
+    """
+    convert = arrow_convert_options(dataset) if dataset else pv.ConvertOptions()
+    convert.column_types = {**dict(convert.column_types), **(column_types or {})}
+    return pv.open_csv(
+        input_path,
+        read_options=pv.ReadOptions(block_size=block_size, use_threads=True),
+        convert_options=convert,
+    )
+
+
+class _Writer:
+    """Parquet or CSV sink chosen from the output extension."""
+
+    def __init__(self, output_path: str, schema: pa.Schema):
+        if output_path.endswith('.csv'):
+            self._w = pv.CSVWriter(output_path, schema)
+        else:
+            self._w = pq.ParquetWriter(output_path, schema, compression='zstd')
+
+    def write(self, table: pa.Table) -> None:
+        if table.num_rows:
+            self._w.write_table(table)
+
+    def close(self) -> None:
+        self._w.close()
+
+
+def _keep_smallest(keys: np.ndarray, n: int, strata: np.ndarray = None) -> np.ndarray:
+    """Positions of the n smallest keys (per stratum when strata is given)."""
+    if strata is None:
+        if len(keys) <= n:
+            return np.arange(len(keys))
+        return np.sort(np.argpartition(keys, n - 1)[:n])
+    order = np.lexsort((keys, strata))  # Sort by stratum, then key
+    sorted_strata = strata[order]
+    starts = np.r_[0, np.flatnonzero(sorted_strata[1:] != sorted_strata[:-1]) + 1]
+    rank = np.arange(len(order)) - np.repeat(starts, np.diff(np.r_[starts, len(order)]))
+    return np.sort(order[rank < n])
+
+
+def stream_sample(input_path: str, output_path: str = None, method: str = 'bernoulli',
+                  fraction: float = 0.01, n: int = None, strata=None, seed: int = 42,
+                  column_types: dict = None, block_size: int = BLOCK_SIZE, dataset: str = None):
+    """
+    Sample a large CSV in one streaming pass.
+
+    Methods:
+    - 'bernoulli': keep each row independently with probability `fraction`
+      (written block by block, constant memory).
+    - 'reservoir': uniform sample of exactly `n` rows without replacement
+      (random keys, keeping the n smallest across blocks).
+    - 'stratified': up to `n` uniformly chosen rows per stratum; `strata` is a
+      function table -> key array (e.g. station_month_strata) or a column name.
+
+    Args:
+    - input_path (str): Source CSV.
+    - output_path (str): '.parquet' or '.csv' destination; None returns the sample only.
+    - fraction (float): Bernoulli keep probability.
+    - n (int): Sample size (reservoir) or per-stratum size (stratified).
+    - seed (int): Root seed; each block draws from its own spawned stream.
+    - column_types (dict): pyarrow types overriding the registry's (or inference, for unregistered files).
+    - dataset (str): schema.DATASETS key (default: matched from the file name; unmatched files are inferred).
+    - block_size (int): CSV bytes per parsed block.
+
+    Returns:
+    - pyarrow.Table: The sample, or None for a Bernoulli sample streamed to output_path.
+    """
+    if method not in ('bernoulli', 'reservoir', 'stratified'):
+        raise ValueError(f"Unknown sampling method: {method}")
+    if method != 'bernoulli' and not n:
+        raise ValueError(f"'{method}' sampling needs a sample size n")
+    if method == 'stratified' and strata is None:
+        strata = station_month_strata
+    if isinstance(strata, str):
+        col = strata
+        strata = lambda t: pc.cast(t.column(col), pa.string()).to_numpy(zero_copy_only=False)  # noqa: E731
+
+    root = np.random.SeedSequence(seed)
+    reader = _open_blocks(input_path, column_types, block_size, dataset or dataset_for(input_path))
+    writer = None
+    kept, kept_keys, kept_strata = [], np.empty(0), None
+    total = sampled = 0
+
+    for batch in reader:
+        rng = np.random.default_rng(root.spawn(1)[0])  # Independent stream per block
+        table = pa.Table.from_batches([batch])
+        total += table.num_rows
+        if method == 'bernoulli':
+            part = table.filter(pa.array(rng.random(table.num_rows) < fraction))
+            sampled += part.num_rows
+            if output_path is not None:
+                writer = writer or _Writer(output_path, table.schema)
+                writer.write(part)
+            else:
+                kept.append(part)
+            continue
+
+        # Reservoir / stratified: merge this block's candidates with the current sample
+        keys = rng.random(table.num_rows)
+        block_strata = strata(table) if method == 'stratified' else None
+        cand = pa.concat_tables(kept + [table]) if kept else table
+        cand_keys = np.concatenate([kept_keys, keys])
+        cand_strata = None if block_strata is None else (
+            block_strata if kept_strata is None else np.concatenate([kept_strata, block_strata]))
+        pos = _keep_smallest(cand_keys, n, cand_strata)
+        kept = [cand.take(pa.array(pos))]
+        kept_keys = cand_keys[pos]
+        kept_strata = None if cand_strata is None else cand_strata[pos]
+
+    if method == 'bernoulli':
+        if writer is not None:
+            writer.close()
+            print(f"Sampled {sampled:,} of {total:,} rows -> {output_path}")
+            return None
+        return pa.concat_tables(kept) if kept else None
+
+    sample = kept[0] if kept else None
+    if output_path is not None and sample is not None:
+        writer = _Writer(output_path, sample.schema)
+        writer.write(sample)
+        writer.close()
+        print(f"Sampled {sample.num_rows:,} of {total:,} rows -> {output_path}")
+    return sample
+
+
+if __name__ == '__main__':
+    # python sampling.py <input.csv> <output.parquet|csv> [fraction]
+    import sys
+    src, dst = sys.argv[1], sys.argv[2]
+    frac = float(sys.argv[3]) if len(sys.argv) > 3 else 0.01
+    if not os.path.exists(src):
+        raise SystemExit(f"File {src} does not exist.")
+    stream_sample(src, dst, method='bernoulli', fraction=frac)
@@ -0,0 +1,318 @@
+# ---------------------------------------------------
+# Declared dtypes for the master table and the raw CSVs
+# Categoricals for repeated strings, narrow ints / float32 for measures and a
+# second-resolution timestamp, applied when writing and when loading df_master.
+# The raw dataset registry drives typed pandas / Spark CSV reads.
+# Dependencies (install with pip if needed):
+#   pandas, numpy, pyarrow
+# ---------------------------------------------------
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from features import LAGS, ROLL_STATS, ROLL_WINDOWS, lag_column, roll_column
+
+TIMESTAMP_DTYPE = 'datetime64[s]'  # Hourly data never needs nanoseconds
+
+# Column -> target dtype. Columns missing from a frame are skipped.
+MASTER_SCHEMA = {
+    'transit_timestamp': TIMESTAMP_DTYPE,
+    # Repeated strings -> categorical codes
+    'transit_mode': 'category',
+    'station_complex_id': 'category',
+    'station_complex': 'category',
+    'borough': 'category',
+    'payment_method': 'category',
+    'fare_class_category': 'category',
+    'Georeference': 'category',
+    'Stop Name': 'category',
+    'Display Name': 'category',
+    'Constituent Station Names': 'category',
+    'Station IDs': 'category',
+    'GTFS Stop IDs': 'category',
+    'Daytime Routes': 'category',
+    'Structure Type': 'category',
+    'ADA': 'category',
+    'ADA Notes': 'category',
+    'Borough': 'category',  # Kept as one column; encoding.py one-hots it sparsely for models
+    # Counts
+    'ridership': 'int32',
+    'transfers': 'int32',
+    'Number Of Stations In Complex': 'int8',
+    # Calendar fields and flags
+    'hour': 'int8',
+    'day_of_week': 'int8',
+    'month': 'int8',
+    'is_weekend': 'int8',
+    'is_alert': 'int8',
+    'Is Complex': 'bool',
+    'CBD': 'bool',
+    # Measures
+    'latitude': 'float32',
+    'longitude': 'float32',
+    'Latitude': 'float32',
+    'Longitude': 'float32',
+    'OD_ridership': 'float32',
+    'distance_to_central': 'float32',
+    # Lag and rolling window features (features.py)
+    **{lag_column(hours): 'float32' for hours in LAGS},
+    **{roll_column(stat, label): 'float32' for label in ROLL_WINDOWS for stat in ROLL_STATS},
+}
+
+_BOOL_VALUES = {'true': True, 'false': False, '1': True, '0': False, '1.0': True, '0.0': False,
+                't': True, 'f': False, 'yes': True, 'no': False, 'y': True, 'n': False}
+
+
+def _cast(s: pd.Series, dtype: str) -> pd.Series:
+    """
+    Cast one column, widening to float32 when an int target would lose NaNs or fractions.
+
+    Flags become bool from True/False values or their string / 0-1 spellings,
+    and the nullable 'boolean' dtype when some are missing or unrecognized.
+    """
+    if str(s.dtype) == dtype:
+        return s
+    if dtype == TIMESTAMP_DTYPE:
+        return pd.to_datetime(s).astype(TIMESTAMP_DTYPE)
+    if dtype == 'category':
+        if pd.api.types.is_numeric_dtype(s) and not isinstance(s.dtype, pd.CategoricalDtype):
+            s = s.astype(str)  # e.g. numeric station_complex_id -> string categories
+        return s.astype('category')
+    if dtype.startswith('int'):
+        v = pd.to_numeric(s, errors='coerce')
+        if v.isna().any() or not np.array_equal(v, np.round(v)):
+            return v.astype('float32')
+        return v.astype(dtype)
+    if dtype == 'bool':
+        # astype(bool) would turn NaN and the string 'False' into True; map the values instead
+        v = s.map(lambda x: _BOOL_VALUES.get(str(x).strip().lower()) if pd.notna(x) else None)
+        return v.astype('boolean') if v.isna().any() else v.astype(bool)
+    return pd.to_numeric(s, errors='coerce').astype(dtype)
+
+
+def apply_master_schema(df: pd.DataFrame, schema: dict = MASTER_SCHEMA) -> pd.DataFrame:
+    """
+    Return a copy of df with the declared compact dtypes applied.
+
+    Args:
+    - df (DataFrame): Master table (any subset of its columns).
+    - schema (dict): Column -> dtype mapping; defaults to MASTER_SCHEMA.
+
+    Returns:
+    - DataFrame: Same columns and rows, compact dtypes.
+    """
+    out = df.copy()
+    for col, dtype in schema.items():
+        if col in out.columns:
+            out[col] = _cast(out[col], dtype)
+    return out
+
+
+def memory_report(df: pd.DataFrame) -> pd.Series:
+    """Deep memory usage per column in MB, largest first."""
+    return (df.memory_usage(deep=True, index=False) / 1024 ** 2).sort_values(ascending=False)
+
+
+# ------------------------------------------------------------------
+# Raw CSV registry: explicit dtypes and timestamp formats per dataset
+# ------------------------------------------------------------------
+MTA_TS_FORMAT = '%m/%d/%Y %I:%M:%S %p'  # e.g. 07/01/2020 12:00:00 AM
+
+# Dataset -> {'dtypes': column -> dtype (file order), 'timestamps': column -> strptime format}.
+# Timestamp columns are read as strings and parsed with their fixed format.
+DATASETS = {
+    'hourly': {
+        'dtypes': {
+            'transit_timestamp': 'str', 'transit_mode': 'category', 'station_complex_id': 'str',
+            'station_complex': 'category', 'borough': 'category', 'payment_method': 'category',
+            'fare_class_category': 'category', 'ridership': 'int32', 'transfers': 'int32',
+            'latitude': 'float64', 'longitude': 'float64', 'Georeference': 'category',
+        },
+        'timestamps': {'transit_timestamp': MTA_TS_FORMAT},
+    },
+    'od': {
+        'dtypes': {
+            'Year': 'int16', 'Month': 'int8', 'Day of Week': 'category', 'Hour of Day': 'int8',
+            'Timestamp': 'str', 'Origin Station Complex ID': 'int32', 'Origin Station Complex Name': 'category',
+            'Origin Latitude': 'float64', 'Origin Longitude': 'float64',
+            'Destination Station Complex ID': 'int32', 'Destination Station Complex Name': 'category',
+            'Destination Latitude': 'float64', 'Destination Longitude': 'float64',
+            'Estimated Average Ridership': 'float64', 'Origin Point': 'category', 'Destination Point': 'category',
+        },
+        'timestamps': {'Timestamp': MTA_TS_FORMAT},
+    },
+    'alerts': {
+        'dtypes': {
+            'Alert ID': 'int64', 'Event ID': 'int64', 'Update Number': 'int32', 'Date': 'str',
+            'Agency': 'category', 'Status Label': 'str', 'Affected': 'str', 'Header': 'str', 'Description': 'str',
+        },
+        'timestamps': {'Date': MTA_TS_FORMAT},
+    },
+    'stations': {
+        'dtypes': {
+            'Complex ID': 'int32', 'Is Complex': 'bool', 'Number Of Stations In Complex': 'int8',
+            'Stop Name': 'str', 'Display Name': 'str', 'Constituent Station Names': 'str', 'Station IDs': 'str',
+            'GTFS Stop IDs': 'str', 'Borough': 'str', 'CBD': 'bool', 'Daytime Routes': 'str',
+            'Structure Type': 'str', 'Latitude': 'float64', 'Longitude': 'float64', 'ADA': 'int8', 'ADA Notes': 'str',
+        },
+        'timestamps': {},
+    },
+    'daily': {
+        'dtypes': {
+            'staten_island_railway_of_comparable_pre_pandemic_day': 'float64',
+            'staten_island_railway_total_estimated_ridership': 'int64', 'itsuid': 'str',
+            'buses_of_comparable_pre_pandemic_day': 'float64', 'buses_total_estimated_ridersip': 'int64',
+            'subways_of_comparable_pre_pandemic_day': 'float64', 'subways_total_estimated_ridership': 'int64',
+            'date': 'str', 'access_a_ride_total_scheduled_trips': 'int64',
+            'metro_north_of_comparable_pre_pandemic_day': 'float64', 'metro_north_total_estimated_ridership': 'int64',
+            'lirr_of_comparable_pre_pandemic_day': 'float64', 'lirr_total_estimated_ridership': 'int64',
+            'bridges_and_tunnels_of_comparable_pre_pandemic_day': 'float64',
+            'bridges_and_tunnels_total_traffic': 'int64', 'access_a_ride_of_comparable_pre_pandemic_day': 'float64',
+        },
+        'timestamps': {'date': '%m/%d/%Y'},
+    },
+    'monthly': {
+        'dtypes': {'Month': 'str', 'Agency': 'category', 'Ridership': 'int64'},
+        'timestamps': {'Month': '%Y-%m-%d'},
+    },
+    'feedback': {
+        'dtypes': {
+            'Agency': 'category', 'Commendation or Complaint': 'category', 'Subject Matter': 'category',
+            'Subject Detail': 'str', 'Issue Detail': 'str', 'Year': 'int16', 'Quarter': 'int8',
+            'Branch/Line/Route': 'category',
+        },
+        'timestamps': {},
+    },
+}
+
+# strptime format -> Spark datetime pattern (for to_timestamp / to_date)
+SPARK_TS_FORMATS = {MTA_TS_FORMAT: 'MM/dd/yyyy hh:mm:ss a', '%m/%d/%Y': 'MM/dd/yyyy', '%Y-%m-%d': 'yyyy-MM-dd'}
+
+# Registry dtype -> pyspark.sql.types class (timestamps stay strings until parsed)
+_SPARK_DTYPES = {
+    'str': 'StringType', 'category': 'StringType', 'bool': 'BooleanType', 'int8': 'ByteType',
+    'int16': 'ShortType', 'int32': 'IntegerType', 'int64': 'LongType', 'float32': 'FloatType',
+    'float64': 'DoubleType',
+}
+
+
+def parse_timestamps(s: pd.Series, fmt: str) -> pd.Series:
+    """
+    Parse strings with one fixed format using pyarrow's strptime.
+
+    Values that do not match are retried as ISO 8601 (still vectorized), so a
+    file exported in another format degrades to a second pass instead of
+    per-element inference; anything left becomes NaT.
+    """
+    if pd.api.types.is_datetime64_any_dtype(s):
+        return s
+    arr = pa.array(s.to_numpy(dtype=object, na_value=None), type=pa.string())
+    parsed = pc.strptime(arr, format=fmt, unit='s', error_is_null=True)  # Vectorized C++ strptime
+    out = pd.Series(parsed.to_numpy(zero_copy_only=False), index=s.index, name=s.name)
+    retry = out.isna() & s.notna()
+    if retry.any():
+        out[retry] = pd.to_datetime(s[retry], format='ISO8601', errors='coerce')
+    return out
+
+
+# File name prefix -> DATASETS key, for loaders that are handed paths rather than dataset names
+DATASET_FILES = {
+    'MTA_Subway_Hourly_Ridership': 'hourly',
+    'MTA_Subway_Origin-Destination_Ridership': 'od',
+    'MTA_Service_Alerts': 'alerts',
+    'MTA_Subway_Stations_and_Complexes': 'stations',
+    'MTA_Daily_Ridership': 'daily',
+    'MTA_Monthly_Ridership': 'monthly',
+    'MTA_Customer_Feedback': 'feedback',
+}
+
+# Registry dtype -> pyarrow type for the streaming CSV reader (categoricals read as strings)
+_ARROW_DTYPES = {
+    'str': pa.string(), 'category': pa.string(), 'bool': pa.bool_(), 'int8': pa.int8(), 'int16': pa.int16(),
+    'int32': pa.int32(), 'int64': pa.int64(), 'float32': pa.float32(), 'float64': pa.float64(),
+}
+
+
+def dataset_for(path: str):
+    """Registered dataset name for a CSV path (matched on the file name), or None."""
+    name = os.path.basename(path)
+    return next((ds for prefix, ds in DATASET_FILES.items() if name.startswith(prefix)), None)
+
+
+def dataset_dtypes(name: str, path: str, columns=None) -> dict:
+    """Registry dtypes for the columns of the file at `path` (optionally a subset); others are inferred."""
+    header = list(pd.read_csv(path, nrows=0).columns)
+    return {c: t for c, t in DATASETS[name]['dtypes'].items()
+            if c in header and (columns is None or c in columns)}
+
+
+def parse_dataset_timestamps(name: str, df: pd.DataFrame) -> pd.DataFrame:
+    """Parse the registered timestamp columns of df in place with their fixed formats."""
+    for col, fmt in DATASETS[name]['timestamps'].items():
+        if col in df.columns:
+            df[col] = parse_timestamps(df[col], fmt)
+    return df
+
+
+def arrow_convert_options(name: str):
+    """
+    pyarrow.csv.ConvertOptions with the registry's column types.
+
+    Timestamp columns are parsed to timestamp[s] with their fixed format
+    (ISO 8601 as a fallback) instead of being inferred per block.
+    """
+    import pyarrow.csv as pv
+    spec = DATASETS[name]
+    types = {c: pa.timestamp('s') if c in spec['timestamps'] else _ARROW_DTYPES[t] for c, t in spec['dtypes'].items()}
+    parsers = list(dict.fromkeys(spec['timestamps'].values())) + [pv.ISO8601]
+    return pv.ConvertOptions(column_types=types, timestamp_parsers=parsers)
+
+
+def read_dataset(name: str, path: str, columns=None, engine: str = 'pyarrow', **read_kwargs) -> pd.DataFrame:
+    """
+    Read a raw MTA CSV with the registry's dtypes and timestamp formats.
+
+    Args:
+    - name (str): Key in DATASETS ('hourly', 'od', 'alerts', 'stations', 'daily', 'monthly', 'feedback').
+    - path (str): CSV path.
+    - columns (list): Optional subset of columns to read (default: every column in the file).
+    - engine (str): pandas CSV engine; 'pyarrow' parses with multiple threads.
+
+    Returns:
+    - DataFrame: Typed columns; registered timestamp columns as datetime64.
+    """
+    usecols = None
+    if columns is not None:
+        header = list(pd.read_csv(path, nrows=0).columns)
+        usecols = [c for c in header if c in columns]
+    dtype = dataset_dtypes(name, path, columns)  # Unregistered columns are inferred
+    df = pd.read_csv(path, usecols=usecols, dtype=dtype, engine=engine, **read_kwargs)
+    return parse_dataset_timestamps(name, df)
+
+
+def spark_schema(name: str, header=None):
+    """
+    Spark StructType for a registered dataset.
+
+    Fields follow `header` order when given (Spark maps CSV columns by position);
+    columns missing from the registry are read as strings.
+    """
+    from pyspark.sql import types
+
+    dtypes = DATASETS[name]['dtypes']
+    return types.StructType([
+        types.StructField(c, getattr(types, _SPARK_DTYPES[dtypes.get(c, 'str')])(), nullable=True)
+        for c in (header or list(dtypes))
+    ])
+
+
+def read_spark_dataset(spark, name: str, path: str, multiline: bool = False):
+    """Read a registered CSV with Spark using its explicit schema instead of inferSchema."""
+    import csv
+    first_line = spark.read.text(path).first()[0]
+    header = next(csv.reader([first_line]))
+    return spark.read.csv(path, header=True, schema=spark_schema(name, header),
+                          multiLine=multiline, escape='"', enforceSchema=False)
@@ -0,0 +1,272 @@
+# ---------------------------------------------------
+# Online inference service for the XGBoost ridership model
+# Loads the model once and answers batched (station, timestamp) requests over
+# HTTP. Lag and rolling features come from an in-memory store of each
+# station's recent ridership (sorted arrays + prefix sums, so a request costs
+# a few binary searches instead of a groupby over history).
+# Usage:
+#   python serve.py --model xgb_model.json --master master_df.parquet --port 8080
+#   curl -XPOST localhost:8080/predict -d '{"instances": [{"station_complex_id": "611",
+#        "transit_timestamp": "2024-05-01 08:00:00", "payment_method": "omny"}]}'
+# Dependencies (install with pip if needed):
+#   pandas, numpy, pyarrow, xgboost>=2.0
+# ---------------------------------------------------
+import argparse
+import json
+import os
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import pandas as pd
+
+from features import KEY, LAGS, ROLL_STATS, ROLL_WINDOWS, SERIES, TIME, lag_column, roll_column
+from master_build import read_state
+from master_store import MASTER_PARQUET_DIR, load_master, master_date_bounds
+from preprocessing import Preprocessor, preprocessor_path
+from train import load_model
+
+MODEL_PATH = 'xgb_model.json'
+# History kept per station: the longest rolling window or lag
+HORIZON = max([pd.Timedelta(w) for w in ROLL_WINDOWS.values()] + [pd.Timedelta(hours=max(LAGS))])
+_WINDOW_SECS = {label: int(pd.Timedelta(w).total_seconds()) for label, w in ROLL_WINDOWS.items()}
+
+
+def _secs(ts) -> np.ndarray:
+    return pd.to_datetime(ts).to_numpy().astype('datetime64[s]').astype('int64')
+
+
+class HistoryStore:
+    """
+    Recent ridership per station and per (station, payment method, fare class) series.
+
+    Features match features.py: rolling windows cover the station's rows in
+    [t - window, t) and a lag is the same series' value exactly `lag` hours earlier.
+    Updates replace a station's arrays under a lock; readers use whatever
+    arrays were current when they started, so predictions never block on updates.
+    """
+
+    def __init__(self, fill_value: float = 0.0, horizon: pd.Timedelta = HORIZON):
+        self.fill_value = fill_value
+        self.horizon = int(horizon.total_seconds())
+        self._stations = {}  # station -> (secs, values, cumsum, cumsum of squares)
+        self._series = {}  # (station, *series values) -> {second: value}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, fill_value: float = None) -> 'HistoryStore':
+        """Store seeded with master rows (KEY, SERIES, TIME, ridership)."""
+        fill_value = float(df['ridership'].median()) if fill_value is None and len(df) else fill_value
+        store = cls(fill_value or 0.0)
+        store.observe(df)
+        return store
+
+    def observe(self, rows: pd.DataFrame) -> None:
+        """Add actual ridership rows and drop history older than the horizon."""
+        rows = rows.assign(_s=_secs(rows[TIME]), _x=pd.to_numeric(rows['ridership'], errors='coerce'))
+        series_cols = [c for c in SERIES if c in rows.columns]
+        with self._lock:
+            for station, group in rows.groupby(rows[KEY].astype(str), sort=False):
+                old_s, old_x = self._stations.get(station, (np.empty(0, 'int64'), np.empty(0)))[:2]
+                s = np.concatenate([old_s, group['_s'].to_numpy()])
+                x = np.concatenate([old_x, group['_x'].to_numpy(dtype='float64')])
+                order = np.argsort(s, kind='stable')
+                s, x = s[order], x[order]
+                keep = s >= s[-1] - self.horizon
+                s, x = s[keep], x[keep]
+                self._stations[station] = (s, x, np.concatenate([[0.0], np.cumsum(np.nan_to_num(x))]),
+                                           np.concatenate([[0.0], np.cumsum(np.nan_to_num(x) ** 2)]),
+                                           np.concatenate([[0], np.cumsum(~np.isnan(x))]))
+                for key, part in group.groupby(series_cols, sort=False, observed=True) if series_cols else [((), group)]:
+                    key = (station, *(key if isinstance(key, tuple) else (key,)))
+                    values = self._series.setdefault(key, {})
+                    values.update(zip(part['_s'].tolist(), part['_x'].tolist()))
+                    cutoff = s[-1] - self.horizon
+                    for sec in [k for k in values if k < cutoff]:
+                        del values[sec]
+
+    def feature_arrays(self, stations, secs: np.ndarray, series=None) -> dict:
+        """
+        Lag and rolling features as float32 arrays (the master table's precision).
+
+        Args:
+        - stations (list): Station id per request row (str).
+        - secs (ndarray): Request times as epoch seconds.
+        - series (list): Per row, the SERIES values (str) identifying its lag series.
+        """
+        n = len(stations)
+        out = {lag_column(h): np.full(n, np.nan) for h in LAGS}
+        out.update({roll_column(stat, label): np.full(n, np.nan) for label in ROLL_WINDOWS for stat in ROLL_STATS})
+        for i in range(n):
+            entry = self._stations.get(stations[i])
+            if entry is None:
+                continue
+            s, x, cs, cs2, cn = entry
+            t = secs[i]
+            right = np.searchsorted(s, t, side='left')
+            for label, w in _WINDOW_SECS.items():
+                left = np.searchsorted(s, t - w, side='left')
+                cnt = cn[right] - cn[left]
+                if cnt == 0:
+                    continue
+                mean = (cs[right] - cs[left]) / cnt
+                out[roll_column('mean', label)][i] = mean
+                if cnt > 1:
+                    var = (cs2[right] - cs2[left] - cnt * mean ** 2) / (cnt - 1)
+                    out[roll_column('std', label)][i] = np.sqrt(max(var, 0.0))
+                window = x[left:right]
+                out[roll_column('min', label)][i] = np.nanmin(window)
+                out[roll_column('max', label)][i] = np.nanmax(window)
+            values = self._series.get((stations[i], *(series[i] if series is not None else ())))
+            if values:
+                for h in LAGS:
+                    out[lag_column(h)][i] = values.get(t - 3600 * h, np.nan)
+        for col, arr in out.items():
+            arr[np.isnan(arr)] = 0.0 if '_roll_std_' in col else self.fill_value
+            out[col] = arr.astype('float32')
+        return out
+
+    def features(self, requests: pd.DataFrame) -> pd.DataFrame:
+        """Lag and rolling feature columns for request rows (KEY, TIME and optional SERIES columns)."""
+        series_cols = [c for c in SERIES if c in requests.columns]
+        series = requests[series_cols].astype(str).to_numpy().tolist() if series_cols else None
+        return pd.DataFrame(self.feature_arrays(requests[KEY].astype(str).tolist(), _secs(requests[TIME]), series),
+                            index=requests.index)
+
+
+def load_artifacts(model_path: str = MODEL_PATH, nthread: int = None) -> tuple:
+    """
+    Booster, preprocessing artifact and iteration range for inplace_predict.
+
+    Models saved without an artifact get one from their own feature order and
+    vocabularies (no scaling).
+    """
+    booster, encoder = load_model(model_path, nthread=nthread)
+    best = getattr(booster, 'best_iteration', None)
+    iteration_range = (0, best + 1) if best is not None else (0, 0)
+    artifact = preprocessor_path(model_path)
+    if os.path.exists(artifact):
+        pre = Preprocessor.load(artifact)
+    else:
+        pre = Preprocessor(booster.feature_names, encoder.vocab if encoder is not None else None)
+    if pre.feature_names != list(booster.feature_names):
+        raise ValueError(f"{artifact} does not match the model's features")
+    return booster, pre, iteration_range
+
+
+class Predictor:
+    """
+    Model, preprocessing artifact, station attributes and history, loaded once per process.
+
+    Requests are assembled straight into a float32 matrix in the model's feature
+    order by preprocessing.Preprocessor, skipping per-request DataFrame
+    construction and categorical conversion.
+    """
+
+    def __init__(self, model_path: str = MODEL_PATH, master_root: str = MASTER_PARQUET_DIR, nthread: int = 1):
+        # Small batches: 1 thread each
+        self.booster, self.pre, self.iteration_range = load_artifacts(model_path, nthread=nthread)
+
+        _, last = master_date_bounds(master_root)
+        recent = load_master(master_root, date_range=(pd.Timestamp(last) - HORIZON, last))
+        latest = recent.drop_duplicates(KEY, keep='last')  # Latest station attributes as defaults
+        self.station_rows = {s: i for i, s in enumerate(latest[KEY].astype(str))}
+        self.station_series = latest[[c for c in SERIES if c in latest.columns]].astype(str).to_numpy().tolist()
+        self.defaults = self.pre.encode(latest)  # Unscaled; scaling happens once per request batch
+        self.history = HistoryStore.from_frame(recent[[c for c in (KEY, *SERIES, TIME, 'ridership')
+                                                       if c in recent.columns]],
+                                               read_state(master_root).get('ridership_median'))
+        self.latencies = deque(maxlen=10_000)
+
+    def frame(self, instances: list) -> np.ndarray:
+        """Model input rows: station defaults, then request fields, then calendar and history features."""
+        stations = [str(row[KEY]) for row in instances]
+        idx = np.array([self.station_rows.get(s, -1) for s in stations])
+        base = self.defaults[np.maximum(idx, 0)]
+        base[idx < 0] = np.nan
+        X = self.pre.encode(instances, base)
+        series = []
+        for i, row in enumerate(instances):
+            default = self.station_series[idx[i]] if idx[i] >= 0 else [None] * len(SERIES)
+            series.append([str(row.get(c, d)) for c, d in zip(SERIES, default)])
+
+        ts = pd.to_datetime([row[TIME] for row in instances])
+        calendar = {'hour': ts.hour, 'day_of_week': ts.dayofweek, 'month': ts.month,
+                    'is_weekend': (ts.dayofweek >= 5).astype(int)}
+        secs = ts.to_numpy().astype('datetime64[s]').astype('int64')
+        for col, values in {**calendar, **self.history.feature_arrays(stations, secs, series)}.items():
+            if col in self.pre.columns:
+                X[:, self.pre.columns[col]] = values
+        return self.pre.scale(X)
+
+    def predict(self, instances: list) -> np.ndarray:
+        t0 = time.perf_counter()
+        preds = self.booster.inplace_predict(self.frame(instances), iteration_range=self.iteration_range)
+        self.latencies.append((time.perf_counter() - t0) * 1000)
+        return preds
+
+    def stats(self) -> dict:
+        """Latency percentiles (ms) over the most recent requests."""
+        if not self.latencies:
+            return {'requests': 0}
+        lat = np.fromiter(self.latencies, dtype='float64')
+        return {'requests': len(lat), 'p50_ms': float(np.percentile(lat, 50)),
+                'p99_ms': float(np.percentile(lat, 99)), 'max_ms': float(lat.max())}
+
+
+def make_handler(predictor: Predictor):
+    """Request handler bound to one Predictor."""
+
+    class Handler(BaseHTTPRequestHandler):
+        def _reply(self, code: int, payload: dict) -> None:
+            body = json.dumps(payload).encode()
+            self.send_response(code)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path == '/health':
+                self._reply(200, {'status': 'ok'})
+            elif self.path == '/stats':
+                self._reply(200, predictor.stats())
+            else:
+                self._reply(404, {'error': 'not found'})
+
+        def do_POST(self):
+            try:
+                payload = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+                if self.path == '/predict':
+                    preds = predictor.predict(payload['instances'])
+                    self._reply(200, {'predictions': preds.tolist()})
+                elif self.path == '/observe':
+                    predictor.history.observe(pd.DataFrame(payload['rows']))
+                    self._reply(200, {'status': 'ok'})
+                else:
+                    self._reply(404, {'error': 'not found'})
+            except (KeyError, ValueError, TypeError) as e:
+                self._reply(400, {'error': str(e)})
+
+        def log_message(self, format, *args):
+            pass  # Per-request access logs would dominate the latency
+
+    return Handler
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Serve ridership predictions over HTTP.")
+    parser.add_argument('--model', default=MODEL_PATH, help="Model saved by train.py")
+    parser.add_argument('--master', default=MASTER_PARQUET_DIR, help="Master dataset for history and station attributes")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    args = parser.parse_args()
+
+    t0 = time.time()
+    predictor = Predictor(args.model, args.master)
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(predictor))
+    print(f"Loaded in {time.time() - t0:.1f}s; serving on http://{args.host}:{args.port} "
+          "(POST /predict, POST /observe, GET /stats)")
+    server.serve_forever()
@@ -0,0 +1,270 @@
+# ---------------------------------------------------
+# Out-of-core master table pipeline on PySpark
+# Runs cleaning -> merges -> feature engineering on the full hourly and OD
+# datasets (no sampling) with Spark's spilling shuffles, and writes the
+# date/borough partitioned Parquet dataset and rollups the dashboard reads.
+# Usage:
+#   python spark_pipeline.py --hourly <hourly.csv> --od <od.csv> --alerts <alerts.csv> \
+#       --stations <stations.csv> --output master_df.parquet --rollups rollups
+# Dependencies (install with pip if needed):
+#   pyspark>=3.4 (Java 11+)
+# ---------------------------------------------------
+import argparse
+
+import pandas as pd
+from pyspark.sql import DataFrame, SparkSession, Window
+from pyspark.sql import functions as F
+
+from features import LAGS, ROLL_STATS, ROLL_WINDOWS, SERIES, lag_column, roll_column
+from geodistance import EARTH_RADIUS_M, TIMES_SQUARE
+from master_build import BOROUGH_MAP, RAW_PATHS
+from master_store import MASTER_PARQUET_DIR
+from rollups import ROLLUP_DIR
+from schema import DATASETS, MASTER_SCHEMA, SPARK_TS_FORMATS, TIMESTAMP_DTYPE, read_spark_dataset
+
+KEY = 'station_complex_id'
+
+# Session settings that can also be applied to the notebooks' existing session
+SQL_CONF = {
+    'spark.sql.caseSensitive': 'true',  # Raw 'borough'/'latitude' vs station 'Borough'/'Latitude'
+    'spark.sql.session.timeZone': 'UTC',
+    'spark.sql.timestampType': 'TIMESTAMP_NTZ',  # Naive timestamps, as in pandas
+    'spark.sql.legacy.timeParserPolicy': 'CORRECTED',  # Unparseable timestamps -> null
+    'spark.sql.parquet.outputTimestampType': 'TIMESTAMP_MICROS',  # Readable by pyarrow
+    'spark.sql.sources.partitionOverwriteMode': 'dynamic',  # Replace only written partitions
+}
+
+# pandas dtype in MASTER_SCHEMA -> Spark SQL type
+SPARK_TYPES = {
+    'category': 'string', 'int32': 'int', 'int8': 'tinyint',
+    'float32': 'float', 'bool': 'boolean', TIMESTAMP_DTYPE: 'timestamp_ntz',
+}
+
+
+def get_spark(app_name: str = "MTA Master Pipeline", driver_memory: str = '8g',
+              shuffle_partitions: int = 400, local_dir: str = None) -> SparkSession:
+    """
+    Create (or reuse) a local Spark session configured for the pipeline.
+
+    Memory stays bounded by driver_memory: joins, dedupes and window functions
+    spill to local_dir instead of materializing the full tables.
+    """
+    builder = (SparkSession.builder.appName(app_name)
+               .config('spark.driver.memory', driver_memory)
+               .config('spark.sql.shuffle.partitions', shuffle_partitions))
+    if local_dir:
+        builder = builder.config('spark.local.dir', local_dir)
+    spark = builder.getOrCreate()
+    for key, value in SQL_CONF.items():
+        spark.conf.set(key, value)
+    return spark
+
+
+def _parse_ts(dataset: str, column: str):
+    """Parse a timestamp column with the registry's fixed format, falling back to ISO strings."""
+    fmt = SPARK_TS_FORMATS[DATASETS[dataset]['timestamps'][column]]
+    return F.coalesce(F.to_timestamp(F.col(column), fmt), F.to_timestamp(F.col(column)))
+
+
+# ------------------------------------------------------------------
+# Cleaning (mirrors the notebook cleaning cells)
+# ------------------------------------------------------------------
+def clean_hourly(df: DataFrame) -> DataFrame:
+    """Parse timestamps and drop invalid/duplicate rows (measures are typed by the read schema)."""
+    return (df.withColumn('transit_timestamp', _parse_ts('hourly', 'transit_timestamp'))
+              .dropna(subset=['transit_timestamp'])
+              .dropDuplicates()
+              .withColumn(KEY, F.col(KEY).cast('string')))
+
+
+def clean_od(df: DataFrame) -> DataFrame:
+    """Median-fill ridership, parse timestamps, dedupe and keep station IDs as strings."""
+    col = 'Estimated Average Ridership'
+    median = df.approxQuantile(col, [0.5], 0.001)
+    if median:
+        df = df.fillna({col: median[0]})
+    return (df.withColumn('Timestamp', _parse_ts('od', 'Timestamp'))
+              .dropna(subset=['Timestamp'])
+              .dropDuplicates()
+              .withColumn('Origin Station Complex ID', F.col('Origin Station Complex ID').cast('string'))
+              .withColumn('Destination Station Complex ID', F.col('Destination Station Complex ID').cast('string')))
+
+
+def clean_alerts(df: DataFrame) -> DataFrame:
+    """Drop alerts without a description or date, normalize labels and dedupe Alert IDs."""
+    return (df.dropna(subset=['Description'])
+              .withColumn('Date', _parse_ts('alerts', 'Date'))
+              .dropna(subset=['Date'])
+              .withColumn('Status Label', F.lower(F.trim(F.col('Status Label'))))
+              .fillna({'Affected': 'Unknown'})
+              .dropDuplicates(['Alert ID']))
+
+
+def _haversine_m(lat, lon, point=TIMES_SQUARE):
+    """Spark expression for the haversine distance in meters (see geodistance.haversine_m)."""
+    lat0, lon0 = F.radians(F.lit(point[0])), F.radians(F.lit(point[1]))
+    dlat, dlon = F.radians(lat) - lat0, F.radians(lon) - lon0
+    a = F.sin(dlat / 2) ** 2 + F.cos(F.radians(lat)) * F.cos(lat0) * F.sin(dlon / 2) ** 2
+    dist = 2 * EARTH_RADIUS_M * F.asin(F.sqrt(a))
+    valid = lat.between(-90, 90) & lon.between(-180, 180)
+    return F.when(valid, dist)
+
+
+def clean_stations(df: DataFrame) -> DataFrame:
+    """
+    Clean station metadata and attach distance_to_central.
+
+    The station table has a few hundred rows, so the distance is computed here
+    once per station instead of on every hourly row after the merge.
+    """
+    df = (df.replace(BOROUGH_MAP, subset=['Borough'])
+            .withColumn('Borough', F.initcap(F.col('Borough')))
+            .fillna({'ADA Notes': 'No Notes'})
+            .dropna(subset=['Latitude', 'Longitude'])
+            .dropDuplicates(['GTFS Stop IDs'])
+            .withColumn('ADA', F.when(F.col('ADA') == 1, 'Yes').otherwise('No'))
+            .withColumnRenamed('Complex ID', KEY)
+            .withColumn(KEY, F.col(KEY).cast('string')))
+    return df.withColumn('distance_to_central', _haversine_m(F.col('Latitude'), F.col('Longitude')))
+
+
+# ------------------------------------------------------------------
+# Merges and features
+# ------------------------------------------------------------------
+def merge_sources(hourly: DataFrame, od: DataFrame, alerts: DataFrame, stations: DataFrame) -> DataFrame:
+    """
+    Station metadata, is_alert and OD_ridership joined onto the hourly rows.
+
+    Same keys as the notebook: stations on station_complex_id, alerts on
+    (date, Stop Name), OD on (date, hour, destination Stop Name).
+    """
+    overlap = (set(hourly.columns) & set(stations.columns)) - {KEY}
+    stations = stations.select([F.col(c).alias(f"{c}_station" if c in overlap else c) for c in stations.columns])
+    df = hourly.join(F.broadcast(stations), on=KEY, how='left')  # A few hundred rows: broadcast
+    df = (df.withColumn('alert_date', F.to_date('transit_timestamp'))
+            .withColumn('hour', F.hour('transit_timestamp')))
+
+    pairs = (alerts.select(F.to_date('Date').alias('alert_date'), F.col('Affected').alias('Stop Name'))
+                   .distinct()
+                   .withColumn('is_alert', F.lit(1)))
+    df = df.join(pairs, on=['alert_date', 'Stop Name'], how='left')
+
+    od_agg = (od.groupBy(F.to_date('Timestamp').alias('alert_date'), F.hour('Timestamp').alias('hour'),
+                         F.col('Destination Station Complex Name').alias('Stop Name'))
+                .agg(F.sum('Estimated Average Ridership').alias('OD_ridership')))
+    df = df.join(od_agg, on=['alert_date', 'hour', 'Stop Name'], how='left')
+    return df.fillna({'is_alert': 0, 'OD_ridership': 0.0})
+
+
+def add_time_features(df: DataFrame) -> DataFrame:
+    """hour, day_of_week (Monday=0), month and is_weekend from transit_timestamp."""
+    dow = (F.dayofweek('transit_timestamp') + 5) % 7  # Spark: Sunday=1 -> pandas: Monday=0
+    return (df.withColumn('hour', F.hour('transit_timestamp'))
+              .withColumn('day_of_week', dow)
+              .withColumn('month', F.month('transit_timestamp'))
+              .withColumn('is_weekend', (dow >= 5).cast('int')))
+
+
+def add_lag_features(df: DataFrame, lags=LAGS, windows: dict = ROLL_WINDOWS) -> DataFrame:
+    """
+    Calendar lags and trailing time-window features, median/0 filled like the notebook.
+
+    A lag is the same series' (station, payment method, fare class) value exactly
+    `lag` hours earlier. Each rolling window covers the same station's rows in
+    [t - window, t), ordered by epoch seconds with rangeBetween, so gaps shrink the
+    window and rows of the same hour are excluded (features.py semantics).
+    """
+    median = df.approxQuantile('ridership', [0.5], 0.001)
+    median = median[0] if median else 0.0
+    secs = F.unix_timestamp(F.col('transit_timestamp').cast('timestamp'))
+    by_series = Window.partitionBy(KEY, *[c for c in SERIES if c in df.columns]).orderBy(secs)
+    fills = {}
+    for hours in lags:
+        col = lag_column(hours)
+        df = df.withColumn(col, F.first('ridership').over(by_series.rangeBetween(-3600 * hours, -3600 * hours)))
+        fills[col] = median
+    by_second = Window.partitionBy(KEY).orderBy(secs)
+    aggs = {'mean': F.avg, 'std': F.stddev_samp, 'min': F.min, 'max': F.max}
+    for label, window in windows.items():
+        past = by_second.rangeBetween(-int(pd.Timedelta(window).total_seconds()), -1)
+        for stat in ROLL_STATS:
+            col = roll_column(stat, label)
+            df = df.withColumn(col, aggs[stat]('ridership').over(past))
+            fills[col] = 0.0 if stat == 'std' else median
+    return df.fillna(fills)
+
+
+def apply_spark_schema(df: DataFrame, schema: dict = MASTER_SCHEMA) -> DataFrame:
+    """Cast the columns declared in schema.MASTER_SCHEMA to the matching Spark types."""
+    return df.select([
+        F.col(c).cast(SPARK_TYPES[schema[c]]).alias(c) if c in schema else F.col(c)
+        for c in df.columns
+    ])
+
+
+def build_master(spark: SparkSession, paths: dict = RAW_PATHS) -> DataFrame:
+    """Lazy master table over the full raw datasets."""
+    hourly = clean_hourly(read_spark_dataset(spark, 'hourly', paths['hourly']))
+    od = clean_od(read_spark_dataset(spark, 'od', paths['od']))
+    alerts = clean_alerts(read_spark_dataset(spark, 'alerts', paths['alerts'], multiline=True))
+    stations = clean_stations(read_spark_dataset(spark, 'stations', paths['stations']))
+    df = merge_sources(hourly, od, alerts, stations)
+    df = add_lag_features(add_time_features(df))
+    return apply_spark_schema(df)  # Categoricals stay string columns; encoding.py encodes them
+
+
+# ------------------------------------------------------------------
+# Outputs
+# ------------------------------------------------------------------
+def write_master(df: DataFrame, root: str = MASTER_PARQUET_DIR) -> None:
+    """
+    Write the master table in the master_store layout (hive date=/borough= partitions).
+
+    Rows are sorted by station and time inside each file, like export_master_parquet.
+    """
+    (df.withColumn('date', F.to_date('transit_timestamp'))
+       .repartition('date')
+       .sortWithinPartitions('borough', KEY, 'transit_timestamp')
+       .write.mode('overwrite')
+       .partitionBy('date', 'borough')
+       .parquet(root))
+
+
+def write_rollups(spark: SparkSession, root: str = MASTER_PARQUET_DIR, out: str = ROLLUP_DIR) -> None:
+    """
+    Build the dashboard cubes from the written master dataset.
+
+    Each cube is written as <out>/<name>.parquet (a directory), which
+    rollups.load_rollups reads unchanged.
+    """
+    master = spark.read.parquet(root).select(KEY, 'transit_timestamp', 'ridership')
+    hourly = (master.groupBy(KEY, F.date_trunc('day', 'transit_timestamp').cast('timestamp_ntz').alias('date'),
+                             F.hour('transit_timestamp').cast('tinyint').alias('hour'))
+                    .agg(F.sum('ridership').alias('ridership')))
+    daily = hourly.groupBy(KEY, 'date').agg(F.sum('ridership').alias('ridership'))
+    weekly = (daily.groupBy(KEY, F.date_trunc('week', 'date').cast('timestamp_ntz').alias('week_start'))  # Monday
+                   .agg(F.sum('ridership').alias('ridership')))
+    for name, cube, order in (('hourly', hourly, [KEY, 'date', 'hour']), ('daily', daily, [KEY, 'date']),
+                              ('weekly', weekly, [KEY, 'week_start'])):
+        cube.orderBy(order).write.mode('overwrite').parquet(f"{out}/{name}.parquet")
+
+
+def run_pipeline(spark: SparkSession, paths: dict = RAW_PATHS, output: str = MASTER_PARQUET_DIR,
+                 rollup_dir: str = ROLLUP_DIR) -> None:
+    """Build and write the full master dataset, then its rollups."""
+    write_master(build_master(spark, paths), output)
+    write_rollups(spark, output, rollup_dir)
+    print(f"Master table -> {output}, rollups -> {rollup_dir}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Build the full master table out of core with PySpark.")
+    for name, path in RAW_PATHS.items():
+        parser.add_argument(f'--{name}', default=path, help=f"Raw {name} CSV")
+    parser.add_argument('--output', default=MASTER_PARQUET_DIR, help="Partitioned master dataset to write")
+    parser.add_argument('--rollups', default=ROLLUP_DIR, help="Rollup directory to write")
+    parser.add_argument('--driver-memory', default='8g', help="Spark driver memory (bounds the working set)")
+    parser.add_argument('--local-dir', default=None, help="Spill directory for shuffles")
+    args = parser.parse_args()
+    session = get_spark(driver_memory=args.driver_memory, local_dir=args.local_dir)
+    run_pipeline(session, {name: getattr(args, name) for name in RAW_PATHS}, args.output, args.rollups)
@@ -0,0 +1,99 @@
+# ---------------------------------------------------
+# Sorted station / timestamp index over the master table
+# Keeps rows ordered by (station_complex_id, transit_timestamp) with an
+# offsets table, so station and date-range lookups are binary searches.
+# Dependencies (install with pip if needed):
+#   pandas, numpy
+# ---------------------------------------------------
+import numpy as np
+import pandas as pd
+
+KEY = 'station_complex_id'
+TS = 'transit_timestamp'
+
+
+class StationIndex:
+    """
+    Station + date-range lookups over a frame sorted by (station_complex_id, transit_timestamp).
+
+    Attributes:
+    - frame (DataFrame): The sorted rows (treat as read-only, slices are views into it).
+    - offsets (DataFrame): One row per station with its [start, stop) row positions.
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        ids = df[KEY].astype(str)
+        if not (ids.is_monotonic_increasing and self._ts_sorted_within(ids, df[TS])):
+            order = np.lexsort((df[TS].to_numpy(), ids.to_numpy()))  # Last key is the primary sort key
+            df = df.iloc[order]
+            ids = ids.iloc[order]
+        self.frame = df.reset_index(drop=True)
+        self._ts = self.frame[TS].to_numpy()
+
+        # Offsets table: rows [start, stop) belong to one station
+        id_values = ids.to_numpy()
+        change = np.flatnonzero(id_values[1:] != id_values[:-1]) + 1
+        starts = np.r_[0, change].astype(np.int64) if len(id_values) else np.empty(0, np.int64)
+        stops = np.r_[change, len(id_values)].astype(np.int64) if len(id_values) else np.empty(0, np.int64)
+        self.offsets = pd.DataFrame({
+            KEY: id_values[starts],
+            'station_complex': self.frame['station_complex'].to_numpy()[starts],
+            'start': starts,
+            'stop': stops,
+        })
+        self._pos = dict(zip(self.offsets[KEY], zip(self.offsets['start'], self.offsets['stop'])))
+        self._name_to_id = dict(zip(self.offsets['station_complex'], self.offsets[KEY]))
+
+    @staticmethod
+    def _ts_sorted_within(ids: pd.Series, ts: pd.Series) -> bool:
+        """True when timestamps never decrease inside a station block."""
+        same = ids.to_numpy()[1:] == ids.to_numpy()[:-1]
+        step = np.diff(ts.to_numpy())
+        return bool((step[same] >= np.timedelta64(0)).all())
+
+    def _bound(self, value) -> np.datetime64:
+        """Convert a date/timestamp to the dtype of the timestamp column."""
+        return np.datetime64(pd.Timestamp(value)).astype(self._ts.dtype)
+
+    def _range(self, start, stop, date_from=None, date_to=None):
+        """Row positions of [date_from, date_to] (inclusive dates) within rows [start, stop)."""
+        ts = self._ts[start:stop]
+        lo = 0 if date_from is None else np.searchsorted(ts, self._bound(date_from), side='left')
+        if date_to is None:
+            hi = len(ts)
+        else:
+            end = pd.Timestamp(date_to).normalize() + pd.Timedelta(days=1)  # Exclusive upper bound
+            hi = np.searchsorted(ts, self._bound(end), side='left')
+        return start + lo, start + hi
+
+    def date_bounds(self):
+        """(min, max) date of the indexed rows."""
+        return pd.Timestamp(self._ts.min()).date(), pd.Timestamp(self._ts.max()).date()
+
+    def station_id(self, station_name: str) -> str:
+        """Map a station_complex name to its station_complex_id."""
+        return self._name_to_id[station_name]
+
+    def station_slice(self, station_id, date_from=None, date_to=None) -> pd.DataFrame:
+        """Rows of one station inside the date range, as a positional slice of frame."""
+        start, stop = self._pos.get(str(station_id), (0, 0))
+        lo, hi = self._range(start, stop, date_from, date_to)
+        return self.frame.iloc[lo:hi]
+
+    def stations_in_range(self, date_from=None, date_to=None) -> list:
+        """Names of the stations that have at least one row in the date range."""
+        names = []
+        for name, start, stop in self.offsets[['station_complex', 'start', 'stop']].itertuples(index=False):
+            lo, hi = self._range(start, stop, date_from, date_to)
+            if hi > lo:
+                names.append(name)
+        return names
+
+    def range_frame(self, date_from=None, date_to=None) -> pd.DataFrame:
+        """All rows inside the date range (one vectorized datetime64 comparison)."""
+        mask = np.ones(len(self._ts), dtype=bool)
+        if date_from is not None:
+            mask &= self._ts >= self._bound(date_from)
+        if date_to is not None:
+            mask &= self._ts < self._bound(pd.Timestamp(date_to).normalize() + pd.Timedelta(days=1))
+        return self.frame.loc[mask]
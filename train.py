@@ -0,0 +1,195 @@
+# ---------------------------------------------------
+# CPU XGBoost training for the ridership model
+# Histogram trees (tree_method='hist') on all available cores, with the
+# quantized training/validation matrices built once and reused by every
+# training run (tuning trials, CV folds) instead of re-binning the frame.
+# Usage:
+#   python train.py --master master_df.parquet --model xgb_model.json --drop-list feature_drop_list.json
+# Dependencies (install with pip if needed):
+#   pandas, numpy, xgboost>=2.0
+# ---------------------------------------------------
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+
+from encoding import CategoryEncoder, vocab_path
+from features import LAGS, ROLL_STATS, ROLL_WINDOWS, SERIES, lag_column, roll_column
+from preprocessing import Preprocessor, preprocessor_path
+
+TARGET = 'ridership'
+TIME = 'transit_timestamp'
+MAX_BIN = 256  # Histogram bins per feature; fixed when the matrices are built
+
+# Model inputs, in order. Everything else in the master table stays out: the
+# partition / calendar-day columns ('date', 'alert_date') and free-text or
+# duplicate station descriptors would only add levels that are never seen again
+# at test and serving time. Columns missing from a frame are skipped.
+FEATURES = (
+    'station_complex_id', *SERIES, 'Borough', 'Structure Type',
+    'transfers', 'latitude', 'longitude', 'distance_to_central',
+    'Is Complex', 'Number Of Stations In Complex', 'CBD', 'ADA',
+    'is_alert', 'OD_ridership', 'hour', 'day_of_week', 'month', 'is_weekend',
+    *(lag_column(hours) for hours in LAGS),
+    *(roll_column(stat, label) for label in ROLL_WINDOWS for stat in ROLL_STATS),
+)
+
+DEFAULT_PARAMS = {
+    'objective': 'reg:squarederror',
+    'tree_method': 'hist',  # CPU histogram algorithm (replaces gpu_hist / gpu_predictor)
+    'learning_rate': 0.05,
+    'max_depth': 6,
+    'eval_metric': 'rmse',
+}
+
+
+def default_nthread() -> int:
+    """Cores this process may run on (respects CPU affinity / container limits)."""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:  # Not available on macOS / Windows
+        return os.cpu_count() or 1
+
+
+def feature_columns(df: pd.DataFrame, drop=None, features=FEATURES) -> list:
+    """The FEATURES present in df, minus `drop`."""
+    drop = set(drop or [])
+    return [c for c in features if c in df.columns and c not in drop]
+
+
+def feature_frame(df: pd.DataFrame, encoder: CategoryEncoder = None, drop=None, features=FEATURES):
+    """
+    Split the master table into model features and target.
+
+    Args:
+    - df (DataFrame): Master rows.
+    - encoder (CategoryEncoder): Fitted encoder; a new one is fitted on the features' string columns if None.
+    - drop (list): Features to leave out (e.g. feature_selection.load_drop_list()).
+    - features (tuple): Candidate feature columns (default: FEATURES).
+
+    Returns:
+    - tuple: (X DataFrame with categorical columns, y Series, encoder).
+    """
+    X = df[feature_columns(df, drop, features)]
+    if encoder is None:
+        encoder = CategoryEncoder().fit(X)
+    return encoder.transform(X), df[TARGET], encoder
+
+
+def build_matrices(X_train: pd.DataFrame, y_train, X_valid: pd.DataFrame = None, y_valid=None,
+                   max_bin: int = MAX_BIN, nthread: int = None):
+    """
+    Quantized training (and validation) matrices, built once and shared by every run.
+
+    The validation matrix reuses the training bin edges (ref=dtrain), so it costs
+    no extra sketching. Every run on these matrices must use the same max_bin.
+
+    Returns:
+    - tuple: (dtrain, dvalid or None) as xgb.QuantileDMatrix.
+    """
+    nthread = nthread or default_nthread()
+    dtrain = xgb.QuantileDMatrix(X_train, label=y_train, max_bin=max_bin, nthread=nthread,
+                                 enable_categorical=True)
+    dvalid = None
+    if X_valid is not None:
+        dvalid = xgb.QuantileDMatrix(X_valid, label=y_valid, ref=dtrain, max_bin=max_bin,
+                                     nthread=nthread, enable_categorical=True)
+    return dtrain, dvalid
+
+
+def train_model(dtrain, dvalid=None, params: dict = None, num_boost_round: int = 1000,
+                early_stopping_rounds: int = 50, nthread: int = None, max_bin: int = MAX_BIN,
+                verbose_eval=100, callbacks=None) -> xgb.Booster:
+    """
+    Train one booster on prebuilt matrices.
+
+    Args:
+    - dtrain, dvalid: Matrices from build_matrices (dvalid enables early stopping).
+    - params (dict): Overrides of DEFAULT_PARAMS.
+    - nthread (int): Training threads (default: all available cores).
+    - max_bin (int): Must match the value the matrices were built with.
+
+    Returns:
+    - xgb.Booster: best_iteration is set when early stopping ran.
+    """
+    params = {**DEFAULT_PARAMS, **(params or {}), 'max_bin': max_bin,
+              'nthread': nthread or default_nthread()}
+    evals = [(dtrain, 'train')] + ([(dvalid, 'valid')] if dvalid is not None else [])
+    return xgb.train(params, dtrain, num_boost_round=num_boost_round, evals=evals,
+                     early_stopping_rounds=early_stopping_rounds if dvalid is not None else None,
+                     verbose_eval=verbose_eval, callbacks=callbacks)
+
+
+def predict(booster: xgb.Booster, data) -> np.ndarray:
+    """Predictions up to the best iteration (all trees when there was no early stopping)."""
+    if not isinstance(data, xgb.DMatrix):
+        data = xgb.DMatrix(data, enable_categorical=True)
+    best = getattr(booster, 'best_iteration', None)
+    return booster.predict(data, iteration_range=(0, best + 1) if best is not None else (0, 0))
+
+
+def evaluate(y_true, y_pred) -> dict:
+    """MAE, RMSE and R² of a prediction."""
+    y_true = np.asarray(y_true, dtype='float64')
+    err = y_true - np.asarray(y_pred, dtype='float64')
+    ss_tot = ((y_true - y_true.mean()) ** 2).sum()
+    return {
+        'mae': float(np.abs(err).mean()),
+        'rmse': float(np.sqrt((err ** 2).mean())),
+        'r2': float(1 - (err ** 2).sum() / ss_tot) if ss_tot else float('nan'),
+    }
+
+
+def time_split(df: pd.DataFrame, test_fraction: float = 0.1):
+    """Chronological train/test split (last test_fraction of timestamps held out), as in the notebook."""
+    df = df.sort_values(TIME, kind='stable')
+    split_index = int(len(df) * (1 - test_fraction))
+    return df.iloc[:split_index], df.iloc[split_index:]
+
+
+def save_model(booster: xgb.Booster, path: str, encoder: CategoryEncoder = None,
+               preprocessor: Preprocessor = None) -> None:
+    """Write the booster (JSON/UBJ by extension) plus its vocabularies and preprocessing artifact next to it."""
+    booster.save_model(path)
+    if encoder is not None:
+        encoder.save(vocab_path(path))
+    if preprocessor is not None:
+        preprocessor.save(preprocessor_path(path))
+
+
+def load_model(path: str, nthread: int = None):
+    """Booster and encoder (None if no vocabulary file) saved by save_model."""
+    booster = xgb.Booster(model_file=path)
+    booster.set_param({'nthread': nthread or default_nthread()})
+    vocab = vocab_path(path)
+    return booster, CategoryEncoder.load(vocab) if os.path.exists(vocab) else None
+
+
+if __name__ == '__main__':
+    from feature_selection import load_drop_list
+    from master_store import load_master
+
+    parser = argparse.ArgumentParser(description="Train the XGBoost ridership model on CPU.")
+    parser.add_argument('--master', default='master_df.parquet', help="Master Parquet dataset")
+    parser.add_argument('--model', default='xgb_model.json', help="Output model file")
+    parser.add_argument('--test-fraction', type=float, default=0.1, help="Most recent share held out")
+    parser.add_argument('--max-bin', type=int, default=MAX_BIN, help="Histogram bins per feature")
+    parser.add_argument('--nthread', type=int, default=None, help="Threads (default: all cores)")
+    parser.add_argument('--rounds', type=int, default=1000, help="Maximum boosting rounds")
+    parser.add_argument('--drop-list', default=None, help="Drop list saved by feature_selection.py")
+    args = parser.parse_args()
+
+    t0 = time.time()
+    train_df, test_df = time_split(load_master(args.master), args.test_fraction)
+    drop = load_drop_list(args.drop_list) if args.drop_list else None
+    X_train, y_train, encoder = feature_frame(train_df, drop=drop)
+    X_test, y_test, _ = feature_frame(test_df, encoder, drop)
+    dtrain, dvalid = build_matrices(X_train, y_train, X_test, y_test, args.max_bin, args.nthread)
+    booster = train_model(dtrain, dvalid, num_boost_round=args.rounds, nthread=args.nthread, max_bin=args.max_bin)
+    scores = evaluate(y_test, predict(booster, dvalid))
+    save_model(booster, args.model, encoder, Preprocessor.fit(X_train, encoder, drop))
+    print(f"MAE {scores['mae']:.4f}  RMSE {scores['rmse']:.4f}  R² {scores['r2']:.4f} "
+          f"({time.time() - t0:.1f}s) -> {args.model}")
@@ -0,0 +1,185 @@
+# ---------------------------------------------------
+# Hyperparameter search for the XGBoost ridership model
+# Randomized search and successive halving over XGBoost parameters. Trials run
+# in parallel threads that all train on the same prebuilt QuantileDMatrix pair
+# (XGBoost releases the GIL), each with early stopping on the validation set;
+# successive halving also prunes the weaker half-or-more of the trials at
+# every rung and keeps training the survivors from where they stopped.
+# Every trial is recorded in a results CSV.
+# Usage:
+#   python tuning.py --master master_df.parquet --method halving --trials 27 --workers 4
+# Dependencies (install with pip if needed):
+#   pandas, numpy, xgboost>=2.0
+# ---------------------------------------------------
+import argparse
+import math
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+
+from train import DEFAULT_PARAMS, MAX_BIN, default_nthread
+
+TUNING_RESULTS = 'tuning_results.csv'
+
+# Parameter -> (distribution, low, high); 'log' samples uniformly in log space
+PARAM_SPACE = {
+    'learning_rate': ('log', 0.01, 0.3),
+    'max_depth': ('int', 3, 10),
+    'min_child_weight': ('log', 1.0, 50.0),
+    'subsample': ('uniform', 0.5, 1.0),
+    'colsample_bytree': ('uniform', 0.5, 1.0),
+    'reg_lambda': ('log', 0.1, 20.0),
+    'reg_alpha': ('log', 1e-3, 5.0),
+}
+
+
+def sample_params(rng: np.random.Generator, space: dict = PARAM_SPACE) -> dict:
+    """Draw one parameter set from the search space."""
+    params = {}
+    for name, (kind, low, high) in space.items():
+        if kind == 'int':
+            params[name] = int(rng.integers(low, high + 1))
+        elif kind == 'log':
+            params[name] = float(np.exp(rng.uniform(np.log(low), np.log(high))))
+        else:
+            params[name] = float(rng.uniform(low, high))
+    return params
+
+
+def _fit(params: dict, dtrain, dvalid, rounds: int, early_stopping_rounds: int, nthread: int,
+         max_bin: int, booster: xgb.Booster = None):
+    """Train (or continue training) one trial; returns (booster, best validation score, stopped early)."""
+    history = {}
+    booster = xgb.train({**DEFAULT_PARAMS, **params, 'max_bin': max_bin, 'nthread': nthread},
+                        dtrain, num_boost_round=rounds, evals=[(dvalid, 'valid')],
+                        early_stopping_rounds=early_stopping_rounds, evals_result=history,
+                        verbose_eval=False, xgb_model=booster)
+    scores = history['valid'][DEFAULT_PARAMS['eval_metric']]
+    stopped = len(scores) < rounds  # Early stopping ended this run before its budget
+    return booster, float(booster.best_score), stopped
+
+
+def _record(rows: list, results_path: str) -> pd.DataFrame:
+    """Results frame, best first; also written to results_path when given."""
+    results = pd.DataFrame(rows).sort_values(['score', 'rounds'], ascending=[True, False], ignore_index=True)
+    if results_path:
+        results.to_csv(results_path, index=False)
+    return results
+
+
+def random_search(dtrain, dvalid, n_trials: int = 20, space: dict = PARAM_SPACE, num_boost_round: int = 1000,
+                  early_stopping_rounds: int = 50, workers: int = None, max_bin: int = MAX_BIN,
+                  seed: int = 42, results_path: str = TUNING_RESULTS) -> pd.DataFrame:
+    """
+    Randomized search: n_trials independent parameter sets, each trained to early stopping.
+
+    Args:
+    - dtrain, dvalid: Matrices from train.build_matrices (shared by every trial).
+    - workers (int): Concurrent trials; the cores are split evenly between them.
+    - max_bin (int): Must match the value the matrices were built with.
+
+    Returns:
+    - DataFrame: One row per trial (score = best validation RMSE), best first.
+    """
+    rng = np.random.default_rng(seed)
+    trials = [sample_params(rng, space) for _ in range(n_trials)]
+    workers = workers or min(n_trials, default_nthread())
+    nthread = max(1, default_nthread() // workers)
+
+    def run(item):
+        trial, params = item
+        t0 = time.time()
+        booster, score, _ = _fit(params, dtrain, dvalid, num_boost_round, early_stopping_rounds, nthread, max_bin)
+        print(f"trial {trial}: rmse {score:.4f} at {booster.best_iteration + 1} rounds")
+        return {'trial': trial, 'rung': 0, 'rounds': booster.best_iteration + 1, 'score': score,
+                'seconds': time.time() - t0, **params}
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        rows = list(pool.map(run, enumerate(trials)))
+    return _record(rows, results_path)
+
+
+def successive_halving(dtrain, dvalid, n_trials: int = 27, space: dict = PARAM_SPACE, min_rounds: int = 50,
+                       max_rounds: int = 1000, eta: int = 3, early_stopping_rounds: int = 50,
+                       workers: int = None, max_bin: int = MAX_BIN, seed: int = 42,
+                       results_path: str = TUNING_RESULTS) -> pd.DataFrame:
+    """
+    Successive halving: train every trial for min_rounds, keep the best 1/eta, grow their
+    budget eta-fold and repeat until one trial remains or max_rounds is reached.
+
+    Survivors continue from their current booster, so no rounds are retrained. Trials
+    that early-stop are not given more rounds but still compete on their best score.
+
+    Returns:
+    - DataFrame: One row per (trial, rung) with the rounds trained so far, best first.
+    """
+    rng = np.random.default_rng(seed)
+    live = {trial: {'params': sample_params(rng, space), 'booster': None, 'rounds': 0, 'score': math.inf,
+                    'stopped': False, 'seconds': 0.0} for trial in range(n_trials)}
+    workers = workers or min(n_trials, default_nthread())
+    rows, rung, budget = [], 0, min_rounds
+
+    def run(trial):
+        state = live[trial]
+        if state['stopped']:
+            return trial
+        t0 = time.time()
+        state['booster'], state['score'], state['stopped'] = _fit(
+            state['params'], dtrain, dvalid, budget - state['rounds'], early_stopping_rounds,
+            max(1, default_nthread() // min(workers, len(live))), max_bin, state['booster'])
+        state['rounds'] = budget
+        state['seconds'] += time.time() - t0
+        return trial
+
+    while True:
+        with ThreadPoolExecutor(max_workers=min(workers, len(live))) as pool:
+            list(pool.map(run, list(live)))
+        for trial, state in live.items():
+            rows.append({'trial': trial, 'rung': rung, 'rounds': state['booster'].best_iteration + 1,
+                         'score': state['score'], 'seconds': state['seconds'], **state['params']})
+        ranked = sorted(live, key=lambda t: live[t]['score'])
+        print(f"rung {rung}: {len(live)} trials at {budget} rounds, best rmse {live[ranked[0]]['score']:.4f}")
+        if len(live) == 1 or budget >= max_rounds:
+            break
+        live = {t: live[t] for t in ranked[:max(1, len(live) // eta)]}  # Prune the rest
+        rung, budget = rung + 1, min(max_rounds, budget * eta)
+    return _record(rows, results_path)
+
+
+def best_params(results: pd.DataFrame, space: dict = PARAM_SPACE) -> dict:
+    """Parameters and round count of the best recorded trial."""
+    best = results.iloc[0]
+    params = {name: (int(best[name]) if space[name][0] == 'int' else float(best[name])) for name in space}
+    return {**params, 'num_boost_round': int(best['rounds'])}
+
+
+if __name__ == '__main__':
+    from master_store import load_master
+    from train import build_matrices, feature_frame, time_split
+
+    parser = argparse.ArgumentParser(description="Tune the XGBoost ridership model.")
+    parser.add_argument('--master', default='master_df.parquet', help="Master Parquet dataset")
+    parser.add_argument('--method', choices=['random', 'halving'], default='halving')
+    parser.add_argument('--trials', type=int, default=27, help="Parameter sets to try")
+    parser.add_argument('--workers', type=int, default=None, help="Concurrent trials")
+    parser.add_argument('--max-rounds', type=int, default=1000, help="Boosting rounds per trial (cap)")
+    parser.add_argument('--test-fraction', type=float, default=0.1, help="Most recent share used for validation")
+    parser.add_argument('--output', default=TUNING_RESULTS, help="Results CSV")
+    args = parser.parse_args()
+
+    t0 = time.time()
+    train_df, valid_df = time_split(load_master(args.master), args.test_fraction)
+    X_train, y_train, encoder = feature_frame(train_df)
+    X_valid, y_valid, _ = feature_frame(valid_df, encoder)
+    dtrain, dvalid = build_matrices(X_train, y_train, X_valid, y_valid)  # Built once for every trial
+    if args.method == 'random':
+        results = random_search(dtrain, dvalid, args.trials, num_boost_round=args.max_rounds,
+                                workers=args.workers, results_path=args.output)
+    else:
+        results = successive_halving(dtrain, dvalid, args.trials, max_rounds=args.max_rounds,
+                                     workers=args.workers, results_path=args.output)
+    print(f"Best: {best_params(results)} ({time.time() - t0:.1f}s) -> {os.path.abspath(args.output)}")